@@ -0,0 +1,206 @@
+"""
+Backend do Google Sheets em memória, compatível com a parte da API do
+gspread usada por utils/google_sheets.py.
+
+Cada requisição pode ter uma latência simulada e uma cota por minuto;
+ao estourar a cota é lançado um erro com status 429, como na API real.
+"""
+import re
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+from gspread.utils import a1_to_rowcol
+
+class FakeAPIError(Exception):
+    """Erro da API simulado (expõe response.status_code como o gspread)"""
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.response = SimpleNamespace(status_code=status_code)
+
+class FakeBackend:
+    """Estado compartilhado: latência, cota e contagem de requisições"""
+
+    def __init__(self, latency=0.0, quota_per_minute=None):
+        self.latency = latency
+        self.quota_per_minute = quota_per_minute
+        self.requests = Counter()
+        self._window = []
+        self._lock = threading.Lock()
+
+    def request(self, method):
+        """Contabiliza uma requisição, aplicando cota e latência"""
+        with self._lock:
+            now = time.monotonic()
+            if self.quota_per_minute is not None:
+                self._window = [t for t in self._window if now - t < 60]
+                if len(self._window) >= self.quota_per_minute:
+                    raise FakeAPIError(429, "Quota exceeded")
+                self._window.append(now)
+            self.requests[method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def reset_counts(self):
+        with self._lock:
+            self.requests.clear()
+
+class FakeWorksheet:
+    def __init__(self, backend, spreadsheet, title, rows, sheet_id=0):
+        self._backend = backend
+        self._spreadsheet = spreadsheet
+        self.id = sheet_id
+        self.title = title
+        self.rows = [list(row) for row in rows]
+
+    def _touch(self):
+        self._spreadsheet.modified += 1
+
+    @property
+    def col_count(self):
+        return max((len(row) for row in self.rows), default=0)
+
+    def _value(self, row, col):
+        if row - 1 < len(self.rows) and col - 1 < len(self.rows[row - 1]):
+            return self.rows[row - 1][col - 1]
+        return ''
+
+    # Leituras
+    def row_values(self, row):
+        self._backend.request('row_values')
+        values = list(self.rows[row - 1]) if row - 1 < len(self.rows) else []
+        while values and values[-1] == '':
+            values.pop()
+        return values
+
+    def col_values(self, col):
+        self._backend.request('col_values')
+        values = [self._value(r, col) for r in range(1, len(self.rows) + 1)]
+        while values and values[-1] == '':
+            values.pop()
+        return values
+
+    def cell(self, row, col):
+        self._backend.request('cell')
+        return SimpleNamespace(row=row, col=col, value=self._value(row, col))
+
+    def get_all_records(self):
+        self._backend.request('get_all_records')
+        headers = self.rows[0] if self.rows else []
+        return [
+            {header: (row[i] if i < len(row) else '') for i, header in enumerate(headers)}
+            for row in self.rows[1:]
+        ]
+
+    def batch_get(self, ranges, major_dimension=None):
+        self._backend.request('batch_get')
+        result = []
+        for a1 in ranges:
+            start, end = a1.split(':')
+            start_row, start_col = a1_to_rowcol(start)
+            end_col = a1_to_rowcol(re.sub(r'\d', '', end) + '1')[1]
+            columns = []
+            for col in range(start_col, end_col + 1):
+                values = [self._value(r, col) for r in range(start_row, len(self.rows) + 1)]
+                while values and values[-1] == '':
+                    values.pop()
+                columns.append(values)
+            while columns and not columns[-1]:
+                columns.pop()
+            if str(major_dimension).upper().endswith('COLUMNS'):
+                result.append(columns)
+            else:
+                size = max((len(c) for c in columns), default=0)
+                result.append([
+                    [c[i] if i < len(c) else '' for c in columns] for i in range(size)
+                ])
+        return result
+
+    # Escritas
+    def batch_update(self, data, value_input_option=None):
+        self._backend.request('batch_update')
+        for item in data:
+            start = item['range'].split(':')[0]
+            row, col = a1_to_rowcol(start)
+            for r_offset, values in enumerate(item['values']):
+                target = row + r_offset
+                while len(self.rows) < target:
+                    self.rows.append([])
+                line = self.rows[target - 1]
+                for c_offset, value in enumerate(values):
+                    index = col - 1 + c_offset
+                    line.extend([''] * (index + 1 - len(line)))
+                    line[index] = value
+        self._touch()
+        return {}
+
+    def append_row(self, values, **kwargs):
+        self._backend.request('append_row')
+        self.rows.append(list(values))
+        self._touch()
+
+    def append_rows(self, values, **kwargs):
+        self._backend.request('append_rows')
+        self.rows.extend(list(v) for v in values)
+        self._touch()
+
+    def add_cols(self, cols):
+        # A grade em memória cresce sozinha com as escritas
+        self._backend.request('add_cols')
+
+    def delete_rows(self, start_index, end_index=None):
+        self._backend.request('delete_rows')
+        end_index = end_index or start_index
+        del self.rows[start_index - 1:end_index]
+        self._touch()
+
+class FakeSpreadsheet:
+    def __init__(self, backend, url):
+        self._backend = backend
+        self.url = url
+        self.modified = 0
+        self._worksheets = {}
+
+    def add_worksheet_with_rows(self, title, rows):
+        """Cria (ou substitui) uma aba com as linhas informadas (cabeçalho incluso)"""
+        worksheet = FakeWorksheet(self._backend, self, title, rows, sheet_id=len(self._worksheets))
+        self._worksheets[title] = worksheet
+        self.modified += 1
+        return worksheet
+
+    def worksheet(self, title):
+        self._backend.request('worksheet')
+        return self._worksheets[title]
+
+    def batch_update(self, body):
+        """Aplica as requisições deleteDimension (ROWS) na ordem recebida"""
+        self._backend.request('spreadsheet_batch_update')
+        by_id = {ws.id: ws for ws in self._worksheets.values()}
+        for request in body.get('requests', []):
+            dimension = request['deleteDimension']['range']
+            worksheet = by_id[dimension['sheetId']]
+            del worksheet.rows[dimension['startIndex']:dimension['endIndex']]
+        self.modified += 1
+        return {}
+
+    def get_lastUpdateTime(self):
+        self._backend.request('get_lastUpdateTime')
+        return f"v{self.modified}"
+
+class FakeClient:
+    """Cliente no lugar do gspread.Client (ver use_client em utils/google_sheets.py)"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or FakeBackend()
+        self._spreadsheets = {}
+
+    def add_spreadsheet(self, url):
+        spreadsheet = FakeSpreadsheet(self.backend, url)
+        self._spreadsheets[url] = spreadsheet
+        return spreadsheet
+
+    def open_by_url(self, url):
+        self.backend.request('open_by_url')
+        return self._spreadsheets[url]
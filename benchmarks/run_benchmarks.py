@@ -0,0 +1,281 @@
+"""
+Benchmarks offline do app, usando o backend do Sheets em memória
+(benchmarks/fake_sheets.py) no lugar da API real.
+
+Mede latência (mediana), número de requisições à API e pico de memória de:
+leitura da aba, busca de usuário, atualização de linha, filtros,
+a tela de login em um processo novo e execuções completas da página
+(streamlit.testing AppTest).
+
+Uso:
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --sizes 1000 10000 --latency 0.05 --repeat 5
+"""
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Espelho local e diário de escritas isolados, definidos antes de importar os módulos do app
+os.environ.setdefault('SHEETS_MIRROR_PATH', os.path.join(tempfile.mkdtemp(), 'mirror.sqlite3'))
+os.environ.setdefault('SHEETS_JOURNAL_PATH', os.path.join(tempfile.mkdtemp(), 'journal.sqlite3'))
+sys.path.insert(0, ROOT)
+
+import app
+import cronograma
+import pandas as pd
+import utils.google_sheets as gs
+from benchmarks.fake_sheets import FakeBackend, FakeClient
+from utils import data_store, filter_cache, local_mirror, scheduler
+from utils.dashboard import apply_row_change, build_summary
+from utils.facets import build_facet_index, SEARCH_COLUMNS
+from utils.journal import JournaledBackend
+from utils.sqlite_store import SQLiteBackend
+from utils.storage import SheetsBackend
+
+SECTORS = ['Viveiro', 'Silvicultura', 'Colheita', 'Inventário', 'Manutenção', 'Pesquisa']
+PEOPLE = [f'Responsável {i}' for i in range(40)]
+STATUSES = ['Pendente', 'Em andamento', 'Concluído']
+WORDS = ['plantio', 'mudas', 'eucalipto', 'adubação', 'colheita', 'irrigação', 'inventário',
+         'talhão', 'poda', 'desbaste', 'controle', 'formigas', 'estrada', 'viveiro', 'meta']
+# Colunas largas de auditoria, que o app não exibe
+AUDIT_COLUMNS = [f'Auditoria {i}' for i in range(12)]
+FILTER_COLUMNS = ['Referência', 'Setor', 'Responsável', 'Descrição Meta']
+
+def make_rows(size, seed=42):
+    """Gera a aba Cronograma (cabeçalho + linhas) com dados sintéticos"""
+    rng = random.Random(seed)
+    headers = cronograma.DATA_COLUMNS + AUDIT_COLUMNS
+    rows = [headers]
+    for i in range(size):
+        person = rng.randrange(len(PEOPLE))
+        record = {
+            gs.ROW_ID_COLUMN: f"r{i:012x}",
+            'Referência': f"REF-{rng.randrange(200):03d}",
+            'Setor': rng.choice(SECTORS),
+            'Responsável': PEOPLE[person],
+            'Descrição Meta': ' '.join(rng.choice(WORDS) for _ in range(8)) + f" {i}",
+            'Status': rng.choice(STATUSES),
+            'E-mail': f"usuario{person}@florestal.com",
+            'Prazo': f"{rng.randrange(1, 29):02d}/{rng.randrange(1, 13):02d}/2025",
+        }
+        rows.append([record.get(h, f"log {i}" if h in AUDIT_COLUMNS else '') for h in headers])
+    return rows
+
+def make_users(count=200):
+    rows = [['Login', 'Email', 'Senha', 'Tipo de Usuário']]
+    for i in range(count):
+        rows.append([f"usuario{i}", f"usuario{i}@florestal.com", app.hash_password('segredo'), 'Usuário'])
+    return rows
+
+def install_backend(size, latency, quota):
+    """Cria o backend em memória e o injeta no app"""
+    client = FakeClient(FakeBackend(latency=latency, quota_per_minute=quota))
+    spreadsheet = client.add_spreadsheet(cronograma.SPREADSHEET_URL)
+    spreadsheet.add_worksheet_with_rows(cronograma.WORKSHEET_DATA, make_rows(size))
+    spreadsheet.add_worksheet_with_rows(cronograma.WORKSHEET_USERS, make_users())
+    gs.use_client(client)
+    gs.invalidate_user_index()
+    data_store.invalidate()
+    filter_cache.clear()
+    local_mirror.clear_mirror()
+    return client
+
+def measure(name, size, backend, fn, setup=None, repeat=3):
+    """Executa fn várias vezes e retorna mediana (ms), requisições e pico de memória"""
+    timings = []
+    requests = 0
+    for _ in range(repeat):
+        if setup:
+            setup()
+        backend.reset_counts()
+        start = time.perf_counter()
+        fn()
+        timings.append(1000 * (time.perf_counter() - start))
+        requests = sum(backend.requests.values())
+
+    # Pico de memória em uma execução separada (tracemalloc deixa tudo mais lento)
+    if setup:
+        setup()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'benchmark': name,
+        'linhas': size,
+        'mediana (ms)': round(statistics.median(timings), 1),
+        'requisições': requests,
+        'pico (MB)': round(peak / 2 ** 20, 1),
+    }
+
+def run_page(admin=True):
+    """Executa a página principal completa com o AppTest do Streamlit"""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=600)
+    at.session_state['logged_in'] = True
+    at.session_state['user'] = (
+        {'Login': 'admin', 'Email': 'admin@florestal.com', 'Tipo de Usuário': 'Administrador'}
+        if admin else
+        {'Login': 'usuario1', 'Email': 'usuario1@florestal.com', 'Tipo de Usuário': 'Usuário'}
+    )
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return at
+
+def run_cold_login():
+    """Exibe a tela de login em um processo Python novo (importações incluídas)"""
+    script = (
+        "import sys; sys.path.insert(0, sys.argv[1])\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        "at = AppTest.from_file(sys.argv[1] + '/app.py', default_timeout=600)\n"
+        "at.run()\n"
+        "sys.exit(1 if at.exception else 0)\n"
+    )
+    subprocess.run([sys.executable, '-c', script, ROOT], check=True, capture_output=True)
+
+def run_size(size, latency, quota, repeat, with_page):
+    client = install_backend(size, latency, quota)
+    backend = client.backend
+    url, data, users = cronograma.SPREADSHEET_URL, cronograma.WORKSHEET_DATA, cronograma.WORKSHEET_USERS
+    results = []
+
+    def cold_mirror():
+        local_mirror.clear_mirror()
+
+    results.append(measure('leitura completa (get_all_records)', size, backend,
+                           lambda: gs.read_sheet_to_dataframe(url, data, schema=cronograma.CRONOGRAMA_SCHEMA),
+                           setup=cold_mirror, repeat=repeat))
+    results.append(measure('leitura projetada (batch_get)', size, backend,
+                           lambda: gs.read_sheet_to_dataframe(url, data, schema=cronograma.CRONOGRAMA_SCHEMA,
+                                                              columns=cronograma.DATA_COLUMNS),
+                           setup=cold_mirror, repeat=repeat))
+    results.append(measure('leitura projetada (espelho local)', size, backend,
+                           lambda: gs.read_sheet_to_dataframe(url, data, schema=cronograma.CRONOGRAMA_SCHEMA,
+                                                              columns=cronograma.DATA_COLUMNS),
+                           repeat=repeat))
+
+    results.append(measure('get_user_by_login (frio)', size, backend,
+                           lambda: gs.get_user_by_login(url, users, 'usuario7'),
+                           setup=lambda: gs.invalidate_user_index(), repeat=repeat))
+    results.append(measure('get_user_by_login (índice)', size, backend,
+                           lambda: gs.get_user_by_login(url, users, 'USUARIO7'), repeat=repeat))
+
+    # Backend SQLite local sincronizado com a planilha (utils/sqlite_store.py)
+    local = SQLiteBackend(os.path.join(tempfile.mkdtemp(), 'storage.sqlite3'), primary=SheetsBackend(url))
+    results.append(measure('sync SQLite (carga da aba)', size, backend,
+                           lambda: local.sync(data),
+                           setup=lambda: local.load_table(data, ['vazio'], [], version=None), repeat=repeat))
+    results.append(measure('leitura projetada (SQLite)', size, backend,
+                           lambda: local.read(data, schema=cronograma.CRONOGRAMA_SCHEMA, columns=cronograma.DATA_COLUMNS),
+                           repeat=repeat))
+    results.append(measure('lookup por login (SQLite)', size, backend,
+                           lambda: local.lookup(users, 'Login', 'USUARIO7'), repeat=repeat))
+
+    results.append(measure('update_row_in_sheet', size, backend,
+                           lambda: gs.update_row_in_sheet(url, data, 2, {'Status': 'Concluído',
+                                                                         'Responsável': PEOPLE[0]}),
+                           repeat=repeat))
+
+    # Diário de escritas: 50 edições enviadas de uma vez (utils/journal.py)
+    journal = JournaledBackend(SheetsBackend(url), path=os.path.join(tempfile.mkdtemp(), 'journal.sqlite3'))
+    edited = random.Random(size).sample(range(size), min(50, size))
+
+    def enqueue_edits():
+        for i in edited:
+            journal.update_record(data, (i + 2, f"r{i:012x}", {}), {'Status': 'Concluído'})
+
+    results.append(measure('diário: envio de 50 edições', size, backend, journal.flush,
+                           setup=enqueue_edits, repeat=repeat))
+
+    df = cronograma.load_data()
+    selection = {'Setor': SECTORS[0], 'Responsável': PEOPLE[3]}
+    results.append(measure('build_facet_index', size, backend,
+                           lambda: build_facet_index(df, FILTER_COLUMNS), repeat=repeat))
+    index = build_facet_index(df, FILTER_COLUMNS)
+    option_columns = [col for col in FILTER_COLUMNS if col not in SEARCH_COLUMNS]
+    # Sem e com os resultados em cache (utils/filter_cache.py)
+    results.append(measure(f'get_filter_options ({len(option_columns)} colunas)', size, backend,
+                           lambda: [cronograma.get_filter_options(df, col, selection, index) for col in option_columns],
+                           setup=filter_cache.clear, repeat=repeat))
+    results.append(measure(f'get_filter_options ({len(option_columns)} colunas, cache)', size, backend,
+                           lambda: [cronograma.get_filter_options(df, col, selection, index) for col in option_columns],
+                           repeat=repeat))
+    results.append(measure('apply_dynamic_filters', size, backend,
+                           lambda: cronograma.apply_dynamic_filters(df, selection, index),
+                           setup=filter_cache.clear, repeat=repeat))
+    results.append(measure('apply_dynamic_filters (cache)', size, backend,
+                           lambda: cronograma.apply_dynamic_filters(df, selection, index), repeat=repeat))
+    # Painel de progresso (utils/dashboard.py): cálculo completo e edição pontual
+    today = pd.Timestamp.now().normalize()
+    results.append(measure('painel: resumo completo', size, backend,
+                           lambda: build_summary(df, today), repeat=repeat))
+    summary = build_summary(df, today)
+    edited_row = df.iloc[[size // 2]]
+    results.append(measure('painel: edição incremental', size, backend,
+                           lambda: apply_row_change(summary, edited_row, edited_row.assign(Status='Concluído')),
+                           repeat=repeat))
+    search_selection = {'Setor': SECTORS[0], 'Descrição Meta': 'adubacao talh'}
+    results.append(measure('busca textual + facetas', size, backend,
+                           lambda: cronograma.apply_dynamic_filters(df, search_selection, index),
+                           setup=filter_cache.clear, repeat=repeat))
+
+    if with_page:
+        results.append(measure('tela de login (processo novo)', size, backend, run_cold_login,
+                               repeat=repeat))
+        results.append(measure('página completa (cache frio)', size, backend, run_page,
+                               setup=lambda: (data_store.invalidate(), filter_cache.clear(), local_mirror.clear_mirror()),
+                               repeat=repeat))
+        results.append(measure('página completa (cache quente)', size, backend, run_page, repeat=repeat))
+        results.append(measure('página completa (usuário comum)', size, backend,
+                               lambda: run_page(admin=False), repeat=repeat))
+    return results
+
+def format_table(results):
+    columns = list(results[0])
+    widths = {c: max(len(c), *(len(str(r[c])) for r in results)) for c in columns}
+    lines = [' | '.join(c.ljust(widths[c]) for c in columns)]
+    lines.append('-+-'.join('-' * widths[c] for c in columns))
+    for r in results:
+        lines.append(' | '.join(str(r[c]).ljust(widths[c]) for c in columns))
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks offline do Sistema de Cronograma")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="Quantidades de linhas da aba Cronograma")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="Latência simulada por requisição (segundos)")
+    parser.add_argument('--quota', type=int, default=None,
+                        help="Cota simulada de requisições por minuto (erros 429 ao estourar)")
+    parser.add_argument('--repeat', type=int, default=3, help="Repetições por medição")
+    parser.add_argument('--no-page', action='store_true', help="Não executa a página completa (AppTest)")
+    parser.add_argument('--output', help="Arquivo onde gravar a tabela de resultados")
+    args = parser.parse_args()
+
+    # A cota do agendador só é aplicada quando uma cota simulada é informada
+    if args.quota is None:
+        scheduler.configure_quota(10 ** 9, 10 ** 9)
+    else:
+        scheduler.configure_quota(args.quota, args.quota)
+
+    results = []
+    for size in args.sizes:
+        results.extend(run_size(size, args.latency, args.quota, args.repeat, not args.no_page))
+
+    table = format_table(results)
+    print(table)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(table + '\n')
+
+if __name__ == '__main__':
+    main()
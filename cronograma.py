@@ -0,0 +1,1031 @@
+import logging
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+from utils.google_sheets import ROW_ID_COLUMN, LOGIN_COLUMN, USER_INDEX_TTL
+from utils.storage import create_backend, STORAGE_CREATE_ROW_IDS
+from utils.bulk_import import (
+    read_upload,
+    prepare_import,
+    run_import,
+    file_key,
+    IMPORT_FILE_TYPES
+)
+from utils.export import export_frame, EXPORT_FORMATS
+from utils.local_mirror import load_checkpoint
+from utils.schema import CRONOGRAMA_SCHEMA, apply_schema, cast_column
+from utils.metrics import timed, snapshot, export_text
+from utils.sessions import revoke_token, SESSION_QUERY_PARAM
+from utils.facets import build_facet_index, facet_positions, facet_values, SEARCH_COLUMNS
+from utils.filter_cache import memoize, normalize_selection
+from utils.dashboard import get_summary, record_row_change, overdue_mask, deadlines, progress_table
+from utils.data_store import (
+    get_frame,
+    patch_frames,
+    invalidate,
+    schedule_reconcile,
+    prefetch,
+    refresh_async,
+    start_refresher,
+    REFRESH_AHEAD,
+    REFRESH_INTERVAL
+)
+
+logger = logging.getLogger(__name__)
+
+# ==================================================
+# CONFIGURAÇÕES
+# ==================================================
+SPREADSHEET_URL = "https://docs.google.com/spreadsheets/d/1VZpV97NIhd16jAyzMpVE_8VhSs-bSqi4DXmySsx2Kc4/edit#gid=761491838"
+WORKSHEET_DATA = "Cronograma"
+WORKSHEET_USERS = "Usuários"
+
+# Paginação dos resultados
+PAGE_SIZE_OPTIONS = [10, 25, 50, 100]
+DEFAULT_PAGE_SIZE = 25
+# Colunas exibidas no modo tabela
+TABLE_COLUMNS = ['Referência', 'Setor', 'Responsável', 'Descrição Meta', 'Status']
+# Colunas baixadas da aba Cronograma (as demais só nos detalhes do registro)
+DATA_COLUMNS = [
+    ROW_ID_COLUMN, 'Referência', 'Setor', 'Responsável', 'Descrição Meta',
+    'Status', 'E-mail', 'Prazo', 'Data Início', 'Data Fim', 'Data de Conclusão'
+]
+# Chave dos dados do cronograma no cache compartilhado
+DATA_CACHE_KEY = WORKSHEET_DATA
+# Colunas conferidas para validar a linha quando a planilha não tem a coluna de ID
+ROW_CHECK_COLUMNS = ['Referência', 'Descrição Meta', 'Responsável']
+# Registros atrasados listados no painel de progresso (os de prazo mais antigo)
+DASHBOARD_OVERDUE_LIMIT = 50
+
+# ==================================================
+# ARMAZENAMENTO
+# ==================================================
+@st.cache_resource
+def get_storage():
+    """
+    Backend de armazenamento do processo: Google Sheets ou banco SQLite local
+    (variáveis de ambiente STORAGE_BACKEND, STORAGE_SYNC e STORAGE_JOURNAL,
+    ver utils/storage.py). O cadastro de usuários não passa pelo diário de
+    escritas, para valer já no login seguinte.
+    """
+    return create_backend(SPREADSHEET_URL, journal_tables=[WORKSHEET_DATA])
+
+# ==================================================
+# USUÁRIOS
+# ==================================================
+def find_user(login):
+    """Registro do usuário com o login informado (sem diferenciar maiúsculas), ou None"""
+    return get_storage().lookup(WORKSHEET_USERS, LOGIN_COLUMN, login)
+
+def add_user(user_data):
+    """Cadastra um usuário (gravado direto na planilha, sem o diário de escritas)"""
+    return get_storage().append(WORKSHEET_USERS, user_data)
+
+# ==================================================
+# FUNÇÕES PRINCIPAIS DO SISTEMA
+# ==================================================
+def load_shared_data():
+    """Carrega a aba do cronograma completa, compartilhada por todas as sessões"""
+    def loader():
+        df = get_storage().read(WORKSHEET_DATA, schema=CRONOGRAMA_SCHEMA, columns=DATA_COLUMNS)
+        # Garante que o DataFrame tenha um índice único para edição/exclusão
+        if df is not None and not df.empty:
+            # Preserva o índice original para uso em operações de edição/exclusão
+            df['_original_index'] = df.index
+        return df
+    
+    # Uma única cópia por processo, atualizada localmente após escritas (e
+    # não substituída por recargas enquanto houver escritas no diário)
+    return get_frame(DATA_CACHE_KEY, loader, pending=lambda: get_storage().pending_writes(WORKSHEET_DATA))
+
+@st.cache_resource(max_entries=16)
+def get_email_index(data_version, _df):
+    """Índice e-mail (minúsculo) -> posições das linhas, uma vez por versão dos dados"""
+    emails = _df['E-mail'].astype(str).str.lower().to_numpy()
+    return _df.groupby(emails, sort=False).indices
+
+def load_data(user_email=None):
+    """Carrega os dados do cronograma com filtro opcional por e-mail"""
+    df = load_shared_data()
+    if df is None or not user_email or 'E-mail' not in df.columns:
+        return df
+    
+    # Visão do usuário: apenas as suas linhas da cópia compartilhada
+    email_index = get_email_index(df.attrs.get('data_version'), df)
+    positions = email_index.get(user_email.lower(), [])
+    view = df.iloc[positions]
+    # A visão tem conteúdo próprio: os índices derivados não podem ser compartilhados
+    view.attrs = {**df.attrs, 'data_version': f"{df.attrs.get('data_version')}:{user_email.lower()}"}
+    return view
+
+@st.cache_resource(max_entries=16)
+def get_row_id_index(data_version, _df):
+    """Índice ID da linha -> posição na planilha, uma vez por versão dos dados"""
+    return dict(zip(_df[ROW_ID_COLUMN].astype(str), _df['_original_index']))
+
+def row_target(row, df=None):
+    """(linha esperada, ID, valores conferidos) de um registro, para localizá-lo na planilha"""
+    expected_row = row.get('_original_index', 0) + 2
+    row_id = str(row.get(ROW_ID_COLUMN, '') or '')
+    
+    # A cópia compartilhada pode já refletir escritas feitas por outras sessões
+    if row_id and df is not None and ROW_ID_COLUMN in df.columns and '_original_index' in df.columns:
+        current = get_row_id_index(df.attrs.get('data_version'), df).get(row_id)
+        if current is not None:
+            expected_row = current + 2
+    return expected_row, row_id or None, {col: row.get(col, '') for col in ROW_CHECK_COLUMNS}
+
+def resolve_sheet_row(row):
+    """
+    Retorna o número atual da linha do registro na planilha, conferido com
+    uma leitura pontual (sem baixar a aba), ou None se ele não existir mais
+    """
+    expected_row, row_id, expected_values = row_target(row, load_shared_data())
+    sheet_row = get_storage().locate(
+        WORKSHEET_DATA,
+        expected_row,
+        row_id=row_id,
+        expected_values=expected_values
+    )
+    if sheet_row is None:
+        st.error("Registro não encontrado: ele foi alterado ou removido na planilha.")
+    if sheet_row != expected_row:
+        # O cache não corresponde mais à planilha: recarrega na próxima leitura
+        invalidate([DATA_CACHE_KEY])
+    return sheet_row
+
+def reconcile_after_write():
+    """
+    Agenda a reconciliação do cache com a planilha. Com escritas ainda no
+    diário, ela fica para depois do envio (ver on_journal_flush), para não
+    trazer de volta uma cópia sem a edição.
+    """
+    if not get_storage().pending_writes(WORKSHEET_DATA):
+        schedule_reconcile()
+
+def record_dashboard_changes(changes):
+    """Deriva o resumo do painel das novas versões a partir das anteriores"""
+    for old, new, before, after in changes:
+        record_row_change(old.attrs.get('data_version'), new.attrs.get('data_version'), before, after)
+
+def patch_cached_row(sheet_row, values):
+    """Aplica a edição de uma linha aos dados em cache de todas as sessões"""
+    changes = []
+    
+    def patch(df):
+        if '_original_index' not in df.columns:
+            return df
+        mask = df['_original_index'] == sheet_row - 2
+        if not mask.any():
+            return df
+        patched = df.copy()
+        for col, val in values.items():
+            if col in patched.columns:
+                # Reaplica o tipo declarado (ex.: novas categorias)
+                column = patched[col].astype(object)
+                column[mask] = val
+                patched[col] = cast_column(column, CRONOGRAMA_SCHEMA.get(col, 'string'))
+        changes.append((df, patched, df[mask], patched[mask]))
+        return patched
+    
+    patch_frames(patch)
+    # As novas versões já foram registradas por patch_frames
+    record_dashboard_changes(changes)
+    reconcile_after_write()
+
+def _append_column(column, value, position, kind):
+    """Coluna com um valor a mais no fim, mantendo o tipo declarado"""
+    new = apply_schema(pd.DataFrame({'v': [value]}, index=[position]), {'v': kind})['v']
+    if isinstance(column.dtype, pd.CategoricalDtype) and isinstance(new.dtype, pd.CategoricalDtype):
+        # Estende as categorias em vez de converter a coluna inteira
+        missing = new.cat.categories.difference(column.cat.categories)
+        column = column.cat.add_categories(missing)
+        new = new.astype(column.dtype)
+    combined = pd.concat([column, new])
+    if combined.dtype != column.dtype:
+        combined = cast_column(combined.astype(object), kind)
+    return combined
+
+def append_cached_row(values):
+    """
+    Inclui um registro recém-adicionado no fim dos dados em cache de todas
+    as sessões, sem recarregar a planilha. Retorna False se não havia cópia
+    onde incluí-lo.
+    """
+    changes = []
+    
+    def patch(df):
+        if '_original_index' not in df.columns:
+            return df
+        position = int(df['_original_index'].max()) + 1 if len(df) else 0
+        columns = {
+            col: _append_column(df[col], values.get(col, ''), position, CRONOGRAMA_SCHEMA.get(col, 'string'))
+            for col in df.columns if col != '_original_index'
+        }
+        columns['_original_index'] = pd.concat([df['_original_index'], pd.Series([position], index=[position])])
+        patched = pd.DataFrame(columns)[list(df.columns)]
+        changes.append((df, patched, df.iloc[:0], patched.iloc[-1:]))
+        return patched
+    
+    patch_frames(patch, [DATA_CACHE_KEY])
+    record_dashboard_changes(changes)
+    reconcile_after_write()
+    return bool(changes)
+
+def drop_cached_rows(sheet_rows):
+    """Remove linhas dos dados em cache, ajustando a numeração das seguintes"""
+    targets = np.unique(np.asarray(sheet_rows, dtype=np.int64) - 2)
+    changes = []
+    
+    def patch(df):
+        if '_original_index' not in df.columns:
+            return df
+        removed = np.isin(df['_original_index'].to_numpy(), targets)
+        patched = df[~removed].copy()
+        # Cada linha sobe tantas posições quantas foram excluídas acima dela
+        remaining = patched['_original_index'].to_numpy()
+        patched['_original_index'] = remaining - np.searchsorted(targets, remaining)
+        patched.index = patched['_original_index'].to_numpy()
+        changes.append((df, patched, df[removed], df.iloc[:0]))
+        return patched
+    
+    patch_frames(patch)
+    record_dashboard_changes(changes)
+    reconcile_after_write()
+
+def drop_cached_row(sheet_row):
+    """Remove uma linha dos dados em cache"""
+    drop_cached_rows([sheet_row])
+
+@st.cache_resource(max_entries=64)
+def get_facet_index(data_version, _df, columns):
+    """Índice de facetas construído uma única vez por versão dos dados"""
+    return build_facet_index(_df, columns)
+
+def get_filter_options(df, column, previous_filters=None, index=None):
+    """
+    Gera opções para os filtros dinâmicos incluindo 'Todos',
+    considerando os filtros já aplicados. As listas ficam em cache (todas as
+    sessões) por versão dos dados e seleção anterior.
+    """
+    def compute():
+        if index is not None and column in index['columns']:
+            # Interseção das posições pré-calculadas, sem varrer o DataFrame
+            unique_values = facet_values(index, column, previous_filters)
+        else:
+            # Se houver filtros anteriores, aplica-os para filtrar o dataframe
+            filtered_df = apply_dynamic_filters(df, previous_filters or {})
+            # Remove valores nulos e duplicados do dataframe filtrado
+            unique_values = filtered_df[column].dropna().unique()
+        
+        return ["Todos"] + sorted([str(x) for x in unique_values if x not in [None, "", " "]])
+    
+    try:
+        key = (column, normalize_selection(previous_filters, SEARCH_COLUMNS))
+        return memoize(df.attrs.get('data_version'), 'options', key, compute)
+    except KeyError:
+        st.error(f"Coluna '{column}' não encontrada na planilha")
+        return ["Todos"]
+    except Exception as e:
+        st.error(f"Erro ao gerar opções para {column}: {str(e)}")
+        return ["Todos"]
+
+def create_dynamic_filters(df, filter_columns, index=None):
+    """
+    Cria os controles de filtro dinâmico e retorna os valores selecionados
+    Filtros são interligados e afetam as opções uns dos outros
+    """
+    filters = {}
+    col_objects = st.columns(len(filter_columns))
+
+    # Inicializando o estado dos filtros se não existir
+    if 'filter_state' not in st.session_state:
+        st.session_state['filter_state'] = {col: "Todos" for col in filter_columns}
+    
+    # Função para atualizar o estado quando um filtro é alterado
+    def on_filter_change(column):
+        # Atualiza o valor no estado da sessão (busca vazia equivale a "Todos")
+        value = st.session_state[f"filter_{column}"]
+        if column in SEARCH_COLUMNS:
+            value = value.strip() or "Todos"
+        st.session_state['filter_state'][column] = value
+        # Reseta os filtros posteriores para evitar seleções inválidas
+        for i, col in enumerate(filter_columns):
+            if filter_columns.index(column) < i:
+                st.session_state['filter_state'][col] = "Todos"
+                st.session_state[f"filter_{col}"] = "" if col in SEARCH_COLUMNS else "Todos"
+        # Volta para a primeira página de resultados
+        st.session_state['results_page'] = 1
+    
+    # Cria os filtros em ordem
+    for i, column in enumerate(filter_columns):
+        with col_objects[i]:
+            try:
+                # Obtém as opções considerando os filtros anteriores
+                previous_filters = {
+                    col: st.session_state['filter_state'][col] 
+                    for col in filter_columns[:i]
+                    if st.session_state['filter_state'][col] != "Todos"
+                }
+                
+                if column in SEARCH_COLUMNS:
+                    # Busca textual (índice invertido) no lugar da lista de valores
+                    query = st.text_input(
+                        f"Buscar em {column}",
+                        key=f"filter_{column}",
+                        placeholder="Palavras ou trechos, sem diferenciar acentos",
+                        on_change=lambda col=column: on_filter_change(col)
+                    )
+                    filters[column] = query.strip() or "Todos"
+                    continue
+                
+                options = get_filter_options(df, column, previous_filters, index)
+                
+                # Se o valor atual não está nas opções, reseta para "Todos"
+                current_value = st.session_state['filter_state'][column]
+                if current_value not in options:
+                    current_value = "Todos"
+                    st.session_state['filter_state'][column] = "Todos"
+                
+                # Cria o selectbox com as opções filtradas
+                filters[column] = st.selectbox(
+                    f"Filtrar por {column}",
+                    options=options,
+                    key=f"filter_{column}",
+                    on_change=lambda col=column: on_filter_change(col),
+                    index=options.index(current_value) if current_value in options else 0
+                )
+            except KeyError:
+                st.error(f"Coluna '{column}' não encontrada")
+                filters[column] = "Todos"
+    
+    return filters
+
+def apply_dynamic_filters(df, filters, index=None):
+    """
+    Aplica múltiplos filtros ao DataFrame de forma segura. Com o índice de
+    facetas, as posições resultantes ficam em cache (todas as sessões) por
+    versão dos dados e seleção. O resultado pode ser a própria cópia
+    compartilhada: não modificar.
+    """
+    try:
+        if index is not None and index['size'] == len(df):
+            positions = memoize(
+                df.attrs.get('data_version'),
+                'positions',
+                normalize_selection(filters, SEARCH_COLUMNS),
+                lambda: facet_positions(index, filters, ranked=True)
+            )
+            return df if positions is None else df.iloc[positions]
+        
+        filtered_df = df
+        for column, value in filters.items():
+            if value != "Todos" and column in filtered_df.columns:
+                if column in SEARCH_COLUMNS:
+                    # Usa busca por substring (contém) em vez de igualdade exata
+                    filtered_df = filtered_df[filtered_df[column].astype(str).str.contains(str(value), case=False, na=False, regex=False)]
+                else:
+                    # Para outros campos, mantém a comparação de igualdade exata
+                    filtered_df = filtered_df[filtered_df[column].astype(str) == str(value)]
+        return filtered_df
+    except KeyError as e:
+        st.error(f"Erro: Coluna '{e.args[0]}' não existe na planilha")
+        return df
+    except Exception as e:
+        st.error(f"Erro ao filtrar dados: {str(e)}")
+        return df
+
+# ==================================================
+# FUNÇÕES DOS MODAIS
+# ==================================================
+def show_edit_modal(row):
+    """Modal de edição"""
+    with st.expander(f"📝 Editando: {row['Referência']}", expanded=True):
+        with st.form(f"edit_form_{row.name}"):
+            # Campos editáveis (ajuste conforme suas colunas)
+            col1, col2 = st.columns(2)
+            with col1:
+                referencia = st.text_input("Referência", value=row.get('Referência', ''))
+                descricao = st.text_area("Descrição Meta", value=row.get('Descrição Meta', ''), height=150)
+            with col2:
+                responsavel = st.text_input("Responsável", value=row.get('Responsável', ''))
+                status = st.selectbox(
+                    "Status", 
+                    options=["Em andamento", "Concluído", "Pendente"],
+                    index=["Em andamento", "Concluído", "Pendente"].index(row.get('Status', 'Pendente'))
+                )
+            
+            if st.form_submit_button("💾 Salvar Alterações"):
+                try:
+                    form_values = {
+                        'Referência': referencia,
+                        'Descrição Meta': descricao,
+                        'Responsável': responsavel,
+                        'Status': status
+                    }
+                    # Envia apenas as células que realmente mudaram
+                    cols_to_update = {
+                        col: val for col, val in form_values.items()
+                        if str(row.get(col, '')) != str(val)
+                    }
+
+                    # Grava a edição (com o diário, confirmada já no disco local;
+                    # a linha é localizada na planilha no envio)
+                    target = row_target(row, load_shared_data())
+                    sheet_row = get_storage().update_record(
+                        WORKSHEET_DATA, target, cols_to_update
+                    ) if cols_to_update else None
+                    updated = not cols_to_update or sheet_row is not None
+                    
+                    if updated:
+                        st.success("Registro atualizado com sucesso!")
+                        # Atualiza só a linha alterada no cache, sem recarregar a planilha
+                        if cols_to_update:
+                            patch_cached_row(sheet_row, cols_to_update)
+                            if sheet_row != target[0]:
+                                # O cache não corresponde mais à planilha: recarrega na próxima leitura
+                                invalidate([DATA_CACHE_KEY])
+                        # Remove o estado de edição
+                        if 'editing_row' in st.session_state:
+                            del st.session_state['editing_row']
+                        st.rerun()
+                    else:
+                        st.error("Erro ao atualizar o registro: ele foi alterado ou removido na planilha.")
+                        invalidate([DATA_CACHE_KEY])
+                except Exception as e:
+                    st.error(f"Erro ao atualizar: {str(e)}")
+            
+            if st.button("❌ Cancelar"):
+                if 'editing_row' in st.session_state:
+                    del st.session_state['editing_row']
+                st.rerun()
+
+def show_delete_modal(row):
+    """Modal de exclusão"""
+    with st.expander(f"🗑️ Excluir: {row['Referência']}", expanded=True):
+        st.warning("Tem certeza que deseja excluir este registro?")
+        
+        # Exibe um resumo dos dados para confirmação
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown(f"**Referência:** {row.get('Referência', 'N/A')}")
+            st.markdown(f"**Descrição:** {row.get('Descrição Meta', 'N/A')}")
+        with col2:
+            st.markdown(f"**Responsável:** {row.get('Responsável', 'N/A')}")
+            st.markdown(f"**Status:** {row.get('Status', 'N/A')}")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("✅ Confirmar Exclusão", type="primary"):
+                try:
+                    sheet_rows = get_storage().delete_records(
+                        WORKSHEET_DATA, [row_target(row, load_shared_data())]
+                    )
+                    if sheet_rows:
+                        st.success("Registro excluído com sucesso!")
+                        # Remove só a linha excluída do cache, sem recarregar a planilha
+                        drop_cached_row(sheet_rows[0])
+                        if 'deleting_row' in st.session_state:
+                            del st.session_state['deleting_row']
+                        st.rerun()
+                    else:
+                        st.error("Erro ao excluir o registro: ele foi alterado ou removido na planilha.")
+                        invalidate([DATA_CACHE_KEY])
+                except Exception as e:
+                    st.error(f"Erro ao excluir: {str(e)}")
+        
+        with col2:
+            if st.button("❌ Cancelar"):
+                if 'deleting_row' in st.session_state:
+                    del st.session_state['deleting_row']
+                st.rerun()
+
+def show_bulk_delete_modal(rows):
+    """Modal de exclusão de vários registros (uma única requisição à planilha)"""
+    with st.expander(f"🗑️ Excluir {len(rows)} registros", expanded=True):
+        st.warning(f"Tem certeza que deseja excluir estes {len(rows)} registros?")
+        summary = pd.DataFrame(rows)
+        st.dataframe(summary[[col for col in TABLE_COLUMNS if col in summary.columns]], hide_index=True)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("✅ Confirmar Exclusão", type="primary", key="bulk_delete_confirm"):
+                try:
+                    df = load_shared_data()
+                    sheet_rows = get_storage().delete_records(
+                        WORKSHEET_DATA, [row_target(row, df) for row in rows]
+                    )
+                    if sheet_rows:
+                        st.success(f"{len(rows)} registros excluídos com sucesso!")
+                        # Uma única atualização do cache para todas as linhas excluídas
+                        drop_cached_rows(sheet_rows)
+                        del st.session_state['bulk_deleting']
+                        st.rerun()
+                    else:
+                        st.error("Erro ao excluir os registros: algum deles foi alterado ou removido "
+                                 "na planilha. Revise a seleção e tente novamente.")
+                        invalidate([DATA_CACHE_KEY])
+                except Exception as e:
+                    st.error(f"Erro ao excluir: {str(e)}")
+        
+        with col2:
+            if st.button("❌ Cancelar", key="bulk_delete_cancel"):
+                del st.session_state['bulk_deleting']
+                st.rerun()
+
+def show_details_modal(row):
+    """Modal de detalhes"""
+    with st.expander(f"🔍 Detalhes: {row['Referência']}", expanded=True):
+        # Os dados em cache têm só as colunas projetadas: a linha completa
+        # é buscada (uma leitura pontual) apenas quando os detalhes são abertos
+        row_key = row.get('_original_index')
+        cached = st.session_state.get('viewing_row_full')
+        if not cached or cached['key'] != row_key:
+            sheet_row = resolve_sheet_row(row)
+            full_row = get_storage().fetch_row(WORKSHEET_DATA, sheet_row) if sheet_row else None
+            cached = {'key': row_key, 'values': full_row or row.to_dict()}
+            st.session_state['viewing_row_full'] = cached
+        
+        # Exibe todos os dados disponíveis de forma formatada
+        for col, val in cached['values'].items():
+            # Ignora colunas internas e metadados
+            if col != '_original_index':
+                st.markdown(f"**{col}:** {val}")
+        
+        if st.button("⬅️ Voltar"):
+            if 'viewing_row' in st.session_state:
+                del st.session_state['viewing_row']
+            st.session_state.pop('viewing_row_full', None)
+            st.rerun()
+
+# ==================================================
+# EXIBIÇÃO DOS RESULTADOS
+# ==================================================
+def show_row_actions(row, key):
+    """Botões de ação (editar, excluir, detalhes) de um registro"""
+    if st.button("📝 Editar", key=f"edit_{key}"):
+        st.session_state['editing_row'] = row.to_dict()
+    
+    if st.button("🗑️ Excluir", key=f"delete_{key}"):
+        st.session_state['deleting_row'] = row.to_dict()
+    
+    if st.button("🔍 Detalhes", key=f"details_{key}"):
+        st.session_state['viewing_row'] = row.to_dict()
+
+def paginate(df):
+    """Controles de paginação; retorna apenas as linhas da página atual"""
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        page_size = st.selectbox(
+            "Registros por página",
+            options=PAGE_SIZE_OPTIONS,
+            index=PAGE_SIZE_OPTIONS.index(DEFAULT_PAGE_SIZE),
+            key="page_size"
+        )
+    
+    total_pages = max(1, -(-len(df) // page_size))
+    # Garante que a página atual continua válida após filtros/trocas de tamanho
+    if st.session_state.get('results_page', 1) > total_pages:
+        st.session_state['results_page'] = total_pages
+    
+    with col2:
+        page = st.number_input(
+            "Página",
+            min_value=1,
+            max_value=total_pages,
+            step=1,
+            key="results_page"
+        )
+    with col3:
+        st.caption(f"Página {page} de {total_pages}")
+    
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size]
+
+def show_results_cards(df):
+    """Exibe os resultados em cartões, criando widgets só para a página atual"""
+    for idx, row in paginate(df).iterrows():
+        with st.container(border=True):
+            # Layout do card
+            cols = st.columns([4, 1])
+            
+            # Coluna esquerda: Dados
+            with cols[0]:
+                st.markdown(f"**Referência:** `{row.get('Referência', 'N/A')}`")
+                st.markdown(f"**Descrição:** {row.get('Descrição Meta', 'N/A')}")
+                st.markdown(f"**Responsável:** {row.get('Responsável', 'N/A')}")
+                st.markdown(f"**Status:** {row.get('Status', 'N/A')}")
+            
+            # Coluna direita: Botões de ação
+            with cols[1]:
+                show_row_actions(row, idx)
+
+def show_results_table(df):
+    """Exibe os resultados em uma única tabela com seleção de linhas"""
+    columns = [col for col in TABLE_COLUMNS if col in df.columns]
+    event = st.dataframe(
+        df[columns],
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="multi-row",
+        key="results_table"
+    )
+    
+    selected = [pos for pos in event.selection.rows if pos < len(df)]
+    if not selected:
+        st.caption("Selecione uma linha para editar, excluir ou ver detalhes, ou várias para excluí-las de uma vez.")
+        return
+    
+    if len(selected) > 1:
+        st.caption(f"{len(selected)} registros selecionados.")
+        if st.button(f"🗑️ Excluir {len(selected)} selecionados", key="table_bulk_delete"):
+            st.session_state['bulk_deleting'] = df.iloc[selected].to_dict('records')
+        return
+    
+    row = df.iloc[selected[0]]
+    cols = st.columns(3)
+    with cols[0]:
+        if st.button("📝 Editar", key="table_edit"):
+            st.session_state['editing_row'] = row.to_dict()
+    with cols[1]:
+        if st.button("🗑️ Excluir", key="table_delete"):
+            st.session_state['deleting_row'] = row.to_dict()
+    with cols[2]:
+        if st.button("🔍 Detalhes", key="table_details"):
+            st.session_state['viewing_row'] = row.to_dict()
+
+def show_export_button(df):
+    """Exporta o resultado filtrado (gerado a partir do cache, só ao clicar)"""
+    col_format, col_download = st.columns([1, 3])
+    with col_format:
+        fmt = st.selectbox(
+            "Formato",
+            options=list(EXPORT_FORMATS),
+            format_func=lambda ext: EXPORT_FORMATS[ext][0],
+            key="export_format",
+            label_visibility="collapsed"
+        )
+    with col_download:
+        # O arquivo é gerado em outra thread, sem bloquear a execução da página
+        st.download_button(
+            "📥 Exportar resultados",
+            data=lambda: export_frame(df, fmt),
+            file_name=f"cronograma.{fmt}",
+            mime=EXPORT_FORMATS[fmt][1],
+            on_click="ignore",
+            key="export_download"
+        )
+
+# ==================================================
+# PAINEL DE PROGRESSO
+# ==================================================
+def show_dashboard(df):
+    """
+    Painel com a conclusão por Setor e por Responsável e os registros
+    atrasados. Os contadores são calculados uma vez por versão dos dados
+    (e atualizados a cada edição pontual), não a cada execução da página.
+    """
+    today = pd.Timestamp.now().normalize()
+    summary = get_summary(df, today)
+    totals = summary['totals']
+    
+    with st.expander("📈 Painel de Progresso"):
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Registros", int(totals['Total']))
+        col2.metric("Concluídos", int(totals['Concluídos']),
+                    f"{100 * totals['Concluídos'] / max(totals['Total'], 1):.0f}%", delta_color="off")
+        col3.metric("Em andamento", int(totals['Em andamento']))
+        col4.metric("Atrasados", int(totals['Atrasados']))
+        
+        progress = st.column_config.ProgressColumn(
+            "% Concluído", format="%.0f%%", min_value=0, max_value=100
+        )
+        for column, counts in summary['groups'].items():
+            st.markdown(f"**Por {column}**")
+            st.dataframe(
+                progress_table(counts).rename_axis(column),
+                column_config={'% Concluído': progress}
+            )
+        
+        if totals['Atrasados']:
+            st.markdown(f"**Atrasados** (até {DASHBOARD_OVERDUE_LIMIT}, do prazo mais antigo)")
+            overdue = df[overdue_mask(df, today)]
+            due = deadlines(overdue)
+            order = np.argsort(due.to_numpy(), kind='stable')[:DASHBOARD_OVERDUE_LIMIT]
+            table = overdue.iloc[order][[col for col in TABLE_COLUMNS if col in overdue.columns]]
+            table = table.assign(**{
+                'Prazo': due.iloc[order].dt.strftime('%d/%m/%Y'),
+                'Dias de atraso': (today - due.iloc[order]).dt.days
+            })
+            st.dataframe(table, hide_index=True)
+
+# ==================================================
+# IMPORTAÇÃO EM LOTE
+# ==================================================
+def show_import_panel(user):
+    """Importa registros de um arquivo CSV/XLSX, adicionados à aba em lotes"""
+    with st.expander("📤 Importar Arquivo", expanded=True):
+        uploaded = st.file_uploader(
+            "Arquivo CSV ou Excel com as mesmas colunas da planilha",
+            type=IMPORT_FILE_TYPES,
+            key="import_file"
+        )
+        if uploaded is None:
+            if st.button("❌ Fechar", key="import_close"):
+                del st.session_state['importing']
+                st.rerun()
+            return
+        
+        content = uploaded.getvalue()
+        try:
+            source = read_upload(uploaded.name, content)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        
+        rows, rejected, ignored = prepare_import(
+            source,
+            get_storage(),
+            WORKSHEET_DATA,
+            required=ROW_CHECK_COLUMNS,
+            defaults={'Status': 'Pendente', 'E-mail': user.get('Email', '')}
+        )
+        if rows is None:
+            st.error("Erro ao ler os cabeçalhos da planilha.")
+            return
+        
+        st.write(f"✅ **{len(rows)}** linhas válidas de {len(source)}")
+        if ignored:
+            st.warning(f"Colunas ignoradas (sem correspondência na planilha): {', '.join(map(str, ignored))}")
+        if not rejected.empty:
+            st.warning(f"{len(rejected)} linhas sem campos obrigatórios não serão importadas.")
+            st.dataframe(rejected, hide_index=True)
+        if not rows:
+            return
+        
+        key = file_key(content, SPREADSHEET_URL, WORKSHEET_DATA)
+        done, total = load_checkpoint(key)
+        if done and total == len(rows):
+            st.info(f"Importação anterior interrompida em {done} de {total} linhas; ela continuará de onde parou.")
+        
+        if st.button(f"📤 Importar {len(rows)} linhas", key="import_run"):
+            progress = st.progress(0.0, text="Importando...")
+            
+            def on_progress(count, size):
+                progress.progress(count / size, text=f"Importando... {count} de {size} linhas")
+            
+            done = run_import(get_storage(), WORKSHEET_DATA, rows, key, on_progress=on_progress)
+            # Recarrega a cópia compartilhada mesmo em importações parciais
+            if done:
+                invalidate([DATA_CACHE_KEY])
+            if done >= len(rows):
+                st.success(f"{len(rows)} registros importados com sucesso!")
+            else:
+                st.error(f"Importação interrompida em {done} de {len(rows)} linhas. "
+                         "Envie o mesmo arquivo novamente para continuar.")
+
+# ==================================================
+# DIAGNÓSTICO
+# ==================================================
+def show_journal_status():
+    """Escritas do diário ainda não enviadas à planilha e as que tiveram conflito"""
+    status = get_storage().journal_status()
+    if status is None:
+        return
+    st.markdown("**Diário de escritas**")
+    st.markdown(
+        f"Pendentes: {status['pending']} · mais antiga há {status['oldest_age']:.0f} s · "
+        f"com conflito: {len(status['failed'])}"
+    )
+    if status.get('last_error'):
+        st.caption(f"Último erro de envio: {status['last_error']}")
+    if status['failed']:
+        st.dataframe(pd.DataFrame(status['failed']), hide_index=True)
+        if st.button("Descartar escritas com conflito", key="journal_discard"):
+            get_storage().discard_failed()
+            st.rerun()
+
+def show_diagnostics_panel():
+    """Painel com as métricas de desempenho do processo (API, cache e tempos)"""
+    with st.expander("🩺 Diagnóstico de desempenho"):
+        show_journal_status()
+        counters, histograms = snapshot()
+        st.markdown("**Tempos (funções, requisições e fases da página)**")
+        st.dataframe(pd.DataFrame(histograms), hide_index=True)
+        st.markdown("**Contadores (requisições, cache e volume de dados)**")
+        st.dataframe(pd.DataFrame(counters), hide_index=True)
+        st.download_button(
+            "📥 Exportar métricas",
+            data=export_text(),
+            file_name="metrics.txt",
+            mime="text/plain"
+        )
+
+# ==================================================
+# FUNÇÃO PRINCIPAL DO SISTEMA
+# ==================================================
+def show_main_app():
+    """Conteúdo principal após login"""
+    # Verificação de segurança
+    if 'user' not in st.session_state:
+        st.error("Sessão inválida. Redirecionando para login...")
+        st.session_state.clear()
+        st.query_params.clear()
+        st.rerun()
+    
+    user = st.session_state['user']
+    is_admin = user.get('Tipo de Usuário') == "Administrador"
+    user_email = None if is_admin else user.get('Email')
+    
+    # Barra superior com informações do usuário
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.title("📅 Sistema de Cronograma")
+    with col2:
+        st.write(f"👤 **Usuário:** {user.get('Login')}")
+        st.write(f"🔑 **Tipo:** {user.get('Tipo de Usuário')}")
+        if st.button("🚪 Sair"):
+            # O link com o token deixa de valer (inclusive em outras abas)
+            revoke_token(st.query_params.get(SESSION_QUERY_PARAM))
+            st.session_state.clear()
+            st.query_params.clear()
+            st.rerun()
+    
+    # Carrega dados
+    with timed('phase_seconds', phase='load_data'):
+        df = load_data(user_email)
+    
+    if df is None:
+        st.error("Erro ao carregar dados. Verifique sua conexão.")
+        return
+    
+    if df.empty:
+        st.warning("Nenhum dado encontrado na planilha.")
+        return
+    
+    # Progresso por Setor e Responsável (sobre todos os registros visíveis ao usuário)
+    with timed('phase_seconds', phase='dashboard'):
+        show_dashboard(df)
+    
+    # Define colunas para filtros (substituindo Status por Descrição Meta)
+    filter_columns = ['Referência', 'Setor', 'Responsável', 'Descrição Meta']
+    
+    # Seção de filtros
+    st.header("Filtros Avançados", divider="rainbow")
+    with timed('phase_seconds', phase='filters'):
+        facet_index = get_facet_index(df.attrs.get('data_version'), df, filter_columns)
+        filters = create_dynamic_filters(df, filter_columns, facet_index)
+        
+        # Aplica filtros
+        filtered_df = apply_dynamic_filters(df, filters, facet_index)
+    
+    # Exibe resultados
+    st.header("Resultados", divider="rainbow")
+    st.subheader(f"📊 Total de registros: {len(filtered_df)}")
+    
+    # Adicionar novo registro (um a um ou importando um arquivo)
+    col_add, col_import = st.columns(2)
+    with col_add:
+        if st.button("➕ Adicionar Novo Registro"):
+            st.session_state['adding_row'] = True
+    with col_import:
+        if st.button("📤 Importar Arquivo"):
+            st.session_state['importing'] = True
+    
+    if st.session_state.get('importing', False):
+        show_import_panel(user)
+    
+    # Modal para adicionar novo registro
+    if st.session_state.get('adding_row', False):
+        with st.expander("➕ Novo Registro", expanded=True):
+            with st.form("add_form"):
+                col1, col2 = st.columns(2)
+                with col1:
+                    referencia = st.text_input("Referência*")
+                    descricao = st.text_area("Descrição Meta*", height=150)
+                with col2:
+                    responsavel = st.text_input("Responsável*")
+                    status = st.selectbox(
+                        "Status*", 
+                        options=["Pendente", "Em andamento", "Concluído"],
+                        index=0
+                    )
+                    
+                if st.form_submit_button("💾 Salvar"):
+                    if not all([referencia, descricao, responsavel]):
+                        st.error("Preencha todos os campos obrigatórios!")
+                    else:
+                        try:
+                            # Adiciona o novo registro como última linha
+                            new_row = {
+                                'Referência': referencia,
+                                'Descrição Meta': descricao,
+                                'Responsável': responsavel,
+                                'Status': status,
+                                'E-mail': user.get('Email', '')  # Associa o email do usuário
+                            }
+                            
+                            # O ID é gerado aqui para que o registro em cache e o da planilha
+                            # coincidam (é ignorado se a aba não tiver a coluna)
+                            new_row[ROW_ID_COLUMN] = get_storage().new_row_id()
+                            # Adiciona como última linha
+                            added = get_storage().append(WORKSHEET_DATA, new_row)
+                            
+                            if added:
+                                st.success("Registro adicionado com sucesso!")
+                                # Inclui o registro no cache, sem recarregar a planilha
+                                if not append_cached_row(new_row):
+                                    invalidate([DATA_CACHE_KEY])
+                                del st.session_state['adding_row']
+                                st.rerun()
+                            else:
+                                st.error("Erro ao adicionar registro.")
+                        except Exception as e:
+                            st.error(f"Erro ao adicionar: {str(e)}")
+                
+                if st.button("❌ Cancelar"):
+                    del st.session_state['adding_row']
+                    st.rerun()
+    
+    # Exibe os resultados filtrados (cartões paginados ou tabela compacta)
+    if not filtered_df.empty:
+        show_export_button(filtered_df)
+        
+        view_mode = st.radio(
+            "Visualização",
+            options=["Cartões", "Tabela"],
+            horizontal=True,
+            key="view_mode"
+        )
+        with timed('phase_seconds', phase='render'):
+            if view_mode == "Tabela":
+                show_results_table(filtered_df)
+            else:
+                show_results_cards(filtered_df)
+    else:
+        st.warning("Nenhum registro corresponde aos filtros selecionados.")
+    
+    # Processa modais de ação
+    if 'editing_row' in st.session_state:
+        show_edit_modal(pd.Series(st.session_state['editing_row']))
+    
+    if 'deleting_row' in st.session_state:
+        show_delete_modal(pd.Series(st.session_state['deleting_row']))
+    
+    if 'bulk_deleting' in st.session_state:
+        show_bulk_delete_modal(st.session_state['bulk_deleting'])
+    
+    if 'viewing_row' in st.session_state:
+        show_details_modal(pd.Series(st.session_state['viewing_row']))
+    
+    # Painel de diagnóstico (somente administradores)
+    if is_admin:
+        show_diagnostics_panel()
+
+# ==================================================
+# PRÉ-CARGA E ATUALIZAÇÃO EM SEGUNDO PLANO
+# ==================================================
+def warm_user_index():
+    """Recarrega o índice de usuários antes que ele expire"""
+    get_storage().refresh_lookup(WORKSHEET_USERS, LOGIN_COLUMN)
+
+def on_journal_flush(tables):
+    """
+    Escritas do diário enviadas: reconcilia a cópia em cache com a planilha
+    quando não restam outras pendentes para a aba
+    """
+    if WORKSHEET_DATA in tables:
+        reconcile_after_write()
+
+def prepare_shared_data():
+    """
+    Pré-carga dos dados. Com STORAGE_CREATE_ROW_IDS, uma planilha sem a coluna
+    de identificadores (ROW_ID_COLUMN) a recebe, preenchida, na primeira
+    execução: sem IDs, cada registro é conferido pelo conteúdo antes de ser gravado.
+    """
+    if not get_storage().ensure_row_ids(WORKSHEET_DATA, create=STORAGE_CREATE_ROW_IDS):
+        logger.warning("Coluna %s indisponível na aba %s: os registros serão localizados pelo conteúdo",
+                       ROW_ID_COLUMN, WORKSHEET_DATA)
+    return load_shared_data()
+
+def sync_storage():
+    """Com o banco local, traz as alterações feitas diretamente na planilha"""
+    if get_storage().sync(WORKSHEET_DATA):
+        refresh_async(DATA_CACHE_KEY)
+
+@st.cache_resource
+def start_background_refresh():
+    """
+    Executado uma vez por processo: pré-carrega as duas abas em paralelo
+    e mantém as cópias em cache atualizadas em segundo plano.
+    Retorna as tarefas da pré-carga.
+    """
+    tasks = prefetch([prepare_shared_data, warm_user_index])
+    # Envia as escritas do diário (inclusive as deixadas por execuções anteriores)
+    get_storage().start(on_flush=on_journal_flush)
+    start_refresher([
+        (warm_user_index, USER_INDEX_TTL * REFRESH_AHEAD),
+        (sync_storage, REFRESH_INTERVAL)
+    ])
+    return tasks
@@ -0,0 +1,31 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Espelho local, diário de escritas e sessões isolados, definidos antes de importar os módulos do app
+os.environ.setdefault('SHEETS_MIRROR_PATH', os.path.join(tempfile.mkdtemp(), 'mirror.sqlite3'))
+os.environ.setdefault('SHEETS_JOURNAL_PATH', os.path.join(tempfile.mkdtemp(), 'journal.sqlite3'))
+os.environ.setdefault('SESSION_STORE_PATH', os.path.join(tempfile.mkdtemp(), 'sessions.sqlite3'))
+sys.path.insert(0, ROOT)
+
+import utils.google_sheets as gs
+from benchmarks.fake_sheets import FakeClient
+from utils import local_mirror, scheduler
+
+SPREADSHEET_URL = 'https://planilha.teste'
+
+@pytest.fixture
+def spreadsheet():
+    """Planilha em memória (benchmarks/fake_sheets.py) no lugar do Google Sheets"""
+    scheduler.configure_quota(10 ** 9, 10 ** 9)
+    client = FakeClient()
+    spreadsheet = client.add_spreadsheet(SPREADSHEET_URL)
+    gs.use_client(client)
+    gs.invalidate_user_index()
+    local_mirror.clear_mirror()
+    yield spreadsheet
+    gs.reset_client()
+    scheduler.configure_quota()
@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+from utils import data_store
+
+KEY = 'teste'
+
+@pytest.fixture(autouse=True)
+def clean_store():
+    data_store.invalidate()
+    yield
+    data_store.invalidate()
+
+def test_refresh_replaces_the_cached_frame():
+    frames = iter([pd.DataFrame({'a': [1]}), pd.DataFrame({'a': [2]})])
+    data_store.get_frame(KEY, lambda: next(frames))
+
+    data_store._refresh(KEY)
+    assert data_store.get_frame(KEY, None)['a'].tolist() == [2]
+
+def test_refresh_keeps_the_patched_frame_while_writes_are_pending():
+    pending = [0]
+    frames = iter([pd.DataFrame({'a': [1]}), pd.DataFrame({'a': [1]}), pd.DataFrame({'a': [1]})])
+    data_store.get_frame(KEY, lambda: next(frames), pending=lambda: pending[0])
+
+    # Edição aplicada ao cache e ainda no diário
+    pending[0] = 1
+    data_store.patch_frames(lambda df: df.assign(a=[5]))
+    data_store._refresh(KEY)
+    assert data_store.get_frame(KEY, None)['a'].tolist() == [5]
+
+    # Depois do envio, a recarga volta a valer
+    pending[0] = 0
+    data_store._refresh(KEY)
+    assert data_store.get_frame(KEY, None)['a'].tolist() == [1]
+
+def test_stale_frame_is_served_while_writes_are_pending(monkeypatch):
+    data_store.get_frame(KEY, lambda: pd.DataFrame({'a': [1]}), pending=lambda: 1)
+    monkeypatch.setattr(data_store, 'refresh_async', lambda key: None)
+    loaded_at = data_store._entries[KEY]['loaded_at']
+    data_store._entries[KEY]['loaded_at'] = loaded_at - data_store.CACHE_TTL * (data_store.MAX_STALE_FACTOR + 1)
+
+    assert data_store.get_frame(KEY, lambda: pd.DataFrame({'a': [9]}))['a'].tolist() == [1]
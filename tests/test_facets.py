@@ -0,0 +1,49 @@
+import pandas as pd
+
+from utils.facets import build_facet_index, facet_positions, facet_values
+
+COLUMNS = ['Setor', 'Status', 'Descrição Meta']
+
+def frame():
+    return pd.DataFrame({
+        'Setor': ['Norte', 'Sul', 'Norte', 'Leste', 'Sul', 'Norte'],
+        'Status': pd.Categorical(['Pendente', 'Concluído', 'Concluído', 'Pendente', 'Pendente', 'Pendente']),
+        'Descrição Meta': ['Poda do café', 'Colheita', 'Poda do milho', 'Adubação', 'Poda geral', 'Irrigação'],
+        'Ano': [2024, 2024, 2025, 2025, 2024, 2025],
+    })
+
+def positions(index, selections, ranked=False):
+    found = facet_positions(index, selections, ranked=ranked)
+    return None if found is None else found.tolist()
+
+def test_selections_are_intersected():
+    index = build_facet_index(frame(), COLUMNS)
+
+    assert positions(index, {'Setor': 'Norte'}) == [0, 2, 5]
+    assert positions(index, {'Setor': 'Norte', 'Status': 'Pendente'}) == [0, 5]
+    assert positions(index, {'Setor': 'Norte', 'Status': 'Pendente', 'Descrição Meta': 'poda'}) == [0]
+    assert positions(index, {'Setor': 'Leste', 'Status': 'Concluído'}) == []
+
+def test_unknown_values_match_nothing_and_todos_is_ignored():
+    index = build_facet_index(frame(), COLUMNS)
+
+    assert positions(index, {'Setor': 'Oeste'}) == []
+    assert positions(index, {'Setor': 'Todos', 'Status': 'Todos'}) is None
+    assert positions(index, {'Descrição Meta': '  '}) is None
+    # Colunas fora do índice não restringem os dados
+    assert positions(index, {'Ano': '2024', 'Setor': 'Sul'}) == [1, 4]
+
+def test_ranked_search_orders_by_relevance():
+    index = build_facet_index(frame(), COLUMNS)
+
+    assert positions(index, {'Descrição Meta': 'poda'}) == [0, 2, 4]
+    # Texto mais curto primeiro; empates mantêm a ordem das linhas
+    assert positions(index, {'Descrição Meta': 'poda'}, ranked=True) == [4, 0, 2]
+    assert positions(index, {'Descrição Meta': 'poda', 'Setor': 'Norte'}, ranked=True) == [0, 2]
+
+def test_facet_values_follow_the_other_selections():
+    index = build_facet_index(frame(), COLUMNS)
+
+    assert facet_values(index, 'Setor') == ['Norte', 'Sul', 'Leste']
+    assert facet_values(index, 'Setor', {'Status': 'Concluído'}) == ['Sul', 'Norte']
+    assert facet_values(index, 'Status', {'Setor': 'Norte', 'Descrição Meta': 'milho'}) == ['Concluído']
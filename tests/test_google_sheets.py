@@ -0,0 +1,176 @@
+import threading
+from types import SimpleNamespace
+
+import utils.google_sheets as gs
+from conftest import SPREADSHEET_URL
+
+def lock_is_free():
+    """Tenta obter a trava do cliente a partir de outra thread"""
+    result = []
+    def probe():
+        acquired = gs._client_lock.acquire(timeout=1)
+        if acquired:
+            gs._client_lock.release()
+        result.append(acquired)
+    thread = threading.Thread(target=probe)
+    thread.start()
+    thread.join()
+    return result[0]
+
+def test_spreadsheet_is_opened_outside_the_client_lock(spreadsheet, monkeypatch):
+    spreadsheet.add_worksheet_with_rows('Aba', [['ID']])
+    client = gs.get_client()
+    free = []
+    original_open, original_worksheet = client.open_by_url, spreadsheet.worksheet
+
+    def open_by_url(url):
+        free.append(lock_is_free())
+        return original_open(url)
+
+    def worksheet(title):
+        free.append(lock_is_free())
+        return original_worksheet(title)
+    monkeypatch.setattr(client, 'open_by_url', open_by_url)
+    monkeypatch.setattr(spreadsheet, 'worksheet', worksheet)
+
+    assert gs.get_worksheet(SPREADSHEET_URL, 'Aba') is spreadsheet._worksheets['Aba']
+    assert free == [True, True]
+
+def test_handles_are_cached(spreadsheet):
+    spreadsheet.add_worksheet_with_rows('Aba', [['ID']])
+    gs.get_worksheet(SPREADSHEET_URL, 'Aba')
+    spreadsheet._backend.reset_counts()
+
+    gs.get_worksheet(SPREADSHEET_URL, 'Aba')
+    assert sum(spreadsheet._backend.requests.values()) == 0
+
+def test_appended_rows_are_not_evaluated(spreadsheet, monkeypatch):
+    worksheet = spreadsheet.add_worksheet_with_rows('Aba', [['ID', 'Meta']])
+    options = []
+    original = worksheet.append_rows
+
+    def append_rows(values, **kwargs):
+        options.append(kwargs.get('value_input_option'))
+        return original(values, **kwargs)
+    monkeypatch.setattr(worksheet, 'append_rows', append_rows)
+
+    rows = [['r1', '=IMPORTXML("https://exemplo", "//a")'], ['r2', '+5']]
+    assert gs.append_rows_in_sheet(SPREADSHEET_URL, 'Aba', rows, chunk_size=1) == 2
+    assert options == ['RAW', 'RAW']
+    assert worksheet.rows[1:] == rows
+
+def test_id_column_is_created_and_filled(spreadsheet):
+    worksheet = spreadsheet.add_worksheet_with_rows('Aba', [['Meta', 'Status'], ['A', ''], ['', 'Pendente'], ['C', 'Feito']])
+    spreadsheet._backend.reset_counts()
+
+    assert gs.ensure_row_ids(SPREADSHEET_URL, 'Aba')
+    assert spreadsheet._backend.requests['batch_update'] == 1
+    assert worksheet.rows[0] == ['Meta', 'Status', gs.ROW_ID_COLUMN]
+    ids = [row[2] for row in worksheet.rows[1:]]
+    assert len(ids) == 3 and len(set(ids)) == 3 and all(ids)
+    assert gs.get_headers(SPREADSHEET_URL, 'Aba')[-1] == gs.ROW_ID_COLUMN
+
+def test_id_column_does_not_overwrite_data_under_blank_headers(spreadsheet):
+    worksheet = spreadsheet.add_worksheet_with_rows('Aba', [['Meta', 'Status'], ['A', '', 'nota'], ['B', 'Feito']])
+
+    assert gs.ensure_row_ids(SPREADSHEET_URL, 'Aba')
+    assert worksheet.rows[0] == ['Meta', 'Status', '', gs.ROW_ID_COLUMN]
+    assert worksheet.rows[1][:3] == ['A', '', 'nota'] and worksheet.rows[1][3]
+    assert worksheet.rows[2][:3] == ['B', 'Feito', ''] and worksheet.rows[2][3]
+
+def test_id_column_is_only_created_when_allowed(spreadsheet):
+    rows = [['Meta'], ['A']]
+    worksheet = spreadsheet.add_worksheet_with_rows('Aba', rows)
+
+    assert not gs.ensure_row_ids(SPREADSHEET_URL, 'Aba', create=False)
+    assert worksheet.rows == rows
+
+def test_existing_id_column_is_kept(spreadsheet):
+    rows = [['ID', 'Meta'], ['r1', 'A'], ['', 'B']]
+    worksheet = spreadsheet.add_worksheet_with_rows('Aba', rows)
+
+    assert gs.ensure_row_ids(SPREADSHEET_URL, 'Aba')
+    assert worksheet.rows == rows
+
+def authorize_stub(monkeypatch, authorized, timeouts):
+    """Autorização sem credenciais reais, registrando as chamadas e o timeout definido"""
+    monkeypatch.setattr(gs.st, 'secrets', {'GOOGLE_CREDENTIALS': {}})
+    monkeypatch.setattr(gs.ServiceAccountCredentials, 'from_json_keyfile_dict',
+                        lambda creds, scope: SimpleNamespace(token_expiry=None))
+    monkeypatch.setattr(gs.gspread, 'authorize', lambda creds: authorized.append(creds) or SimpleNamespace(
+        set_timeout=timeouts.append
+    ))
+    gs.reset_client()
+
+def test_client_is_authorized_once(monkeypatch):
+    authorized = []
+    authorize_stub(monkeypatch, authorized, [])
+
+    client = gs.get_client()
+    # O token é renovado pela sessão HTTP: nada de nova autorização (nem descarte dos caches)
+    monkeypatch.setattr(gs.time, 'time', lambda: 10 ** 12)
+    assert gs.get_client() is client
+    assert len(authorized) == 1
+    gs.reset_client()
+
+def test_client_requests_have_a_timeout(monkeypatch):
+    timeouts = []
+    authorize_stub(monkeypatch, [], timeouts)
+
+    gs.get_client()
+    assert timeouts == [gs.HTTP_TIMEOUT]
+    gs.reset_client()
+
+def insert_column(worksheet, position, header):
+    """Insere uma coluna na aba em memória (como feito pela interface do Sheets)"""
+    for i, row in enumerate(worksheet.rows):
+        row.insert(position, header if i == 0 else '')
+
+def test_updates_follow_columns_inserted_after_headers_were_cached(spreadsheet):
+    worksheet = spreadsheet.add_worksheet_with_rows('Aba', [['ID', 'Meta', 'Status'], ['r1', 'Plantio', 'Pendente']])
+    gs.get_headers(SPREADSHEET_URL, 'Aba')
+    insert_column(worksheet, 1, 'Setor')
+
+    assert gs.update_rows_in_sheet(SPREADSHEET_URL, 'Aba', {2: {'Status': 'Concluído'}})
+    assert worksheet.rows[1] == ['r1', '', 'Plantio', 'Concluído']
+
+def test_locate_follows_a_moved_id_column(spreadsheet):
+    worksheet = spreadsheet.add_worksheet_with_rows('Aba', [['ID', 'Meta'], ['r1', 'A'], ['r2', 'B']])
+    gs.get_headers(SPREADSHEET_URL, 'Aba')
+    insert_column(worksheet, 0, 'Setor')
+
+    assert gs.locate_rows(SPREADSHEET_URL, 'Aba', [(None, 'r2', None), (None, 'r9', None)]) == [3, None]
+    assert gs.locate_row(SPREADSHEET_URL, 'Aba', 2, row_id='r2') == 3
+
+def test_cached_headers_expire(spreadsheet, monkeypatch):
+    worksheet = spreadsheet.add_worksheet_with_rows('Aba', [['ID', 'Meta']])
+    gs.get_headers(SPREADSHEET_URL, 'Aba')
+    insert_column(worksheet, 1, 'Setor')
+    assert gs.get_headers(SPREADSHEET_URL, 'Aba') == ['ID', 'Meta']
+
+    now = gs.time.time()
+    monkeypatch.setattr(gs.time, 'time', lambda: now + gs.HEADERS_TTL + 1)
+    assert gs.get_headers(SPREADSHEET_URL, 'Aba') == ['ID', 'Setor', 'Meta']
+
+def test_projected_read_follows_columns_changed_in_the_sheet(spreadsheet):
+    worksheet = spreadsheet.add_worksheet_with_rows('Aba', [['ID', 'Meta', 'Status'], ['r1', 'Plantio', 'Pendente']])
+    assert gs.fetch_records(SPREADSHEET_URL, 'Aba', ['Meta', 'Status']) == {'Meta': ['Plantio'], 'Status': ['Pendente']}
+
+    insert_column(worksheet, 1, 'Setor')
+    spreadsheet.modified += 1
+    assert gs.fetch_records(SPREADSHEET_URL, 'Aba', ['Meta', 'Status']) == {'Meta': ['Plantio'], 'Status': ['Pendente']}
+
+def test_row_ranges_group_neighbours_from_the_bottom_up():
+    assert gs._row_ranges([]) == []
+    assert gs._row_ranges([7]) == [[7, 7]]
+    assert gs._row_ranges([2, 3, 4]) == [[2, 4]]
+    # Fora de ordem e com repetições: intervalos do último para o primeiro
+    assert gs._row_ranges([5, 2, 9, 3, 5, 10, 11]) == [[9, 11], [5, 5], [2, 3]]
+
+def test_scattered_rows_are_deleted_in_one_request(spreadsheet):
+    worksheet = spreadsheet.add_worksheet_with_rows('Aba', [['ID']] + [[f'r{i}'] for i in range(2, 10)])
+    spreadsheet._backend.reset_counts()
+
+    assert gs.delete_rows_in_sheet(SPREADSHEET_URL, 'Aba', [3, 8, 4, 9, 6])
+    assert spreadsheet._backend.requests['spreadsheet_batch_update'] == 1
+    assert [row[0] for row in worksheet.rows[1:]] == ['r2', 'r5', 'r7']
@@ -0,0 +1,229 @@
+import sqlite3
+
+import pytest
+
+import utils.google_sheets as gs
+from benchmarks.fake_sheets import FakeAPIError
+from conftest import SPREADSHEET_URL
+from utils.journal import JournaledBackend
+from utils.storage import SheetsBackend
+
+TABLE = 'Cronograma'
+
+@pytest.fixture
+def worksheet(spreadsheet):
+    rows = [['ID', 'Meta', 'Status']] + [[f'r{i}', f'Meta {i}', 'Pendente'] for i in range(2, 7)]
+    return spreadsheet.add_worksheet_with_rows(TABLE, rows)
+
+@pytest.fixture
+def journal(tmp_path, worksheet):
+    return JournaledBackend(SheetsBackend(SPREADSHEET_URL), path=str(tmp_path / 'journal.sqlite3'))
+
+def fail_reads(monkeypatch, worksheet, *methods):
+    """Faz as leituras informadas da aba falharem (erro da API sem nova tentativa)"""
+    def fail(*args, **kwargs):
+        raise FakeAPIError(400, "Falha de leitura")
+    for method in methods:
+        monkeypatch.setattr(worksheet, method, fail)
+
+def make_due(journal):
+    """Antecipa as novas tentativas agendadas"""
+    conn = sqlite3.connect(journal.path)
+    with conn:
+        conn.execute("UPDATE entries SET next_attempt_at = 0")
+    conn.close()
+
+def ids(worksheet):
+    return [row[0] for row in worksheet.rows[1:]]
+
+def test_writes_are_confirmed_before_reaching_the_sheet(journal, worksheet):
+    assert journal.update_record(TABLE, (2, 'r2', None), {'Status': 'Concluído'}) == 2
+    assert journal.delete_records(TABLE, [(3, 'r3', None)]) == [3]
+    assert journal.append(TABLE, {'Meta': 'Nova'}) is True
+
+    assert journal.journal_status()['pending'] == 3
+    assert worksheet.rows[1][2] == 'Pendente'
+    assert 'r3' in ids(worksheet)
+
+def test_flush_applies_entries_in_order(journal, worksheet):
+    journal.update_record(TABLE, (2, 'r2', None), {'Status': 'Em andamento'})
+    journal.update_record(TABLE, (2, 'r2', None), {'Status': 'Concluído'})
+    journal.delete_records(TABLE, [(3, 'r3', None), (4, 'r4', None)])
+    journal.append(TABLE, {'Meta': 'Nova'})
+
+    assert journal.flush() == 5
+    assert journal.journal_status()['pending'] == 0
+    assert worksheet.rows[1] == ['r2', 'Meta 2', 'Concluído']
+    assert ids(worksheet)[:3] == ['r2', 'r5', 'r6']
+    # A nova linha recebe um ID gerado na hora da escrita
+    assert worksheet.rows[-1][1] == 'Nova' and worksheet.rows[-1][0].startswith('r')
+
+def test_update_of_removed_record_is_kept_as_conflict(journal, worksheet):
+    journal.update_record(TABLE, (9, 'removido', None), {'Status': 'Concluído'})
+
+    assert journal.flush() == 0
+    status = journal.journal_status()
+    assert status['pending'] == 0
+    assert len(status['failed']) == 1
+    journal.discard_failed()
+    assert journal.journal_status()['failed'] == []
+
+@pytest.mark.parametrize('methods', [('col_values',), ('row_values',)])
+def test_delete_is_retried_when_locating_fails(journal, worksheet, monkeypatch, methods):
+    journal.delete_records(TABLE, [(3, 'r3', None)])
+    fail_reads(monkeypatch, worksheet, *methods)
+
+    assert journal.flush() == 0
+    # Uma leitura que falhou não é tratada como registro já removido
+    assert journal.journal_status()['pending'] == 1
+    assert 'r3' in ids(worksheet)
+
+def test_update_is_retried_when_locating_fails(journal, worksheet, monkeypatch):
+    journal.update_record(TABLE, (2, 'r2', None), {'Status': 'Concluído'})
+    fail_reads(monkeypatch, worksheet, 'col_values')
+
+    assert journal.flush() == 0
+    status = journal.journal_status()
+    assert status['pending'] == 1
+    assert status['failed'] == []
+
+def test_update_without_id_is_retried_when_row_read_fails(journal, worksheet, monkeypatch):
+    journal.update_record(TABLE, (2, None, {'Meta': 'Meta 2'}), {'Status': 'Concluído'})
+    fail_reads(monkeypatch, worksheet, 'row_values')
+
+    assert journal.flush() == 0
+    status = journal.journal_status()
+    assert status['pending'] == 1
+    assert status['failed'] == []
+
+@pytest.mark.parametrize('write', [
+    lambda journal: journal.update_record(TABLE, (2, 'r2', None), {'Status': 'Concluído'}),
+    lambda journal: journal.delete_records(TABLE, [(3, 'r3', None)]),
+    lambda journal: journal.append(TABLE, {'Meta': 'Nova'}),
+])
+def test_entries_are_retried_when_headers_cannot_be_read(journal, worksheet, monkeypatch, write):
+    write(journal)
+    before = [list(row) for row in worksheet.rows]
+    monkeypatch.setattr('utils.google_sheets.get_headers', lambda *args, **kwargs: None)
+
+    assert journal.flush() == 0
+    status = journal.journal_status()
+    assert status['pending'] == 1
+    assert status['failed'] == []
+    assert worksheet.rows == before
+
+def test_retried_entries_are_sent_after_the_backoff(journal, worksheet, monkeypatch):
+    journal.delete_records(TABLE, [(3, 'r3', None)])
+    fail_reads(monkeypatch, worksheet, 'col_values')
+    journal.flush()
+    monkeypatch.undo()
+
+    # Ainda em espera pela nova tentativa
+    assert journal.flush() == 0
+    make_due(journal)
+    assert journal.flush() == 1
+    assert 'r3' not in ids(worksheet)
+
+def test_append_retry_does_not_duplicate_written_rows(journal, worksheet, monkeypatch):
+    journal.append(TABLE, {'Meta': 'Nova'})
+    original = worksheet.append_rows
+
+    def append_then_fail(values, **kwargs):
+        # A escrita chega à planilha, mas a resposta se perde
+        original(values, **kwargs)
+        raise FakeAPIError(400, "Conexão interrompida")
+    monkeypatch.setattr(worksheet, 'append_rows', append_then_fail)
+    assert journal.flush() == 0
+    monkeypatch.undo()
+
+    make_due(journal)
+    assert journal.flush() == 1
+    assert [row[1] for row in worksheet.rows].count('Nova') == 1
+
+def test_entries_survive_a_restart(journal, worksheet):
+    journal.update_record(TABLE, (2, 'r2', None), {'Status': 'Concluído'})
+
+    restarted = JournaledBackend(journal.inner, path=journal.path)
+    assert restarted.journal_status()['pending'] == 1
+    assert restarted.flush() == 1
+    assert worksheet.rows[1][2] == 'Concluído'
+
+def test_tables_outside_the_journal_are_written_directly(spreadsheet, tmp_path):
+    users = spreadsheet.add_worksheet_with_rows('Usuarios', [['Login']])
+    backend = JournaledBackend(SheetsBackend(SPREADSHEET_URL), path=str(tmp_path / 'j.sqlite3'),
+                               tables=[TABLE])
+
+    assert backend.append('Usuarios', {'Login': 'ana'})
+    assert users.rows == [['Login'], ['ana']]
+    assert backend.journal_status()['pending'] == 0
+
+def test_on_flush_receives_the_written_tables(journal, worksheet):
+    touched = []
+    journal._on_flush = touched.append
+    journal.update_record(TABLE, (2, 'r2', None), {'Status': 'Concluído'})
+
+    journal.flush()
+    assert touched == [{TABLE}]
+
+def test_append_accepted_without_headers_keeps_the_record(journal, worksheet, monkeypatch):
+    # Planilha inacessível no momento da escrita
+    monkeypatch.setattr('utils.google_sheets.get_headers', lambda *args, **kwargs: None)
+    assert journal.append(TABLE, {'Meta': 'Offline', 'Status': 'Pendente'}) is True
+    assert journal.flush() == 0
+    assert journal.journal_status()['pending'] == 1
+    monkeypatch.undo()
+
+    make_due(journal)
+    assert journal.flush() == 1
+    row = worksheet.rows[-1]
+    assert row[1:] == ['Offline', 'Pendente'] and row[0].startswith('r')
+
+def test_append_follows_the_headers_at_flush_time(journal, worksheet):
+    journal.append(TABLE, {'Meta': 'Nova', 'Status': 'Concluído'})
+    # Colunas reordenadas na planilha antes do envio
+    worksheet.rows = [[row[0], row[2], row[1]] for row in worksheet.rows]
+    gs.get_headers(SPREADSHEET_URL, TABLE, refresh=True)
+
+    assert journal.flush() == 1
+    assert worksheet.rows[-1][1:] == ['Concluído', 'Nova']
+
+def test_second_instance_does_not_send_entries_in_flight(journal, worksheet, monkeypatch):
+    other = JournaledBackend(journal.inner, path=journal.path)
+    journal.append(TABLE, {'Meta': 'Nova'})
+    journal.update_record(TABLE, (2, 'r2', None), {'Status': 'Concluído'})
+    original = worksheet.append_rows
+    flushed = []
+
+    def append_during_other_flush(values, **kwargs):
+        # Outra instância (ex.: de um rerun anterior) envia enquanto esta grava
+        flushed.append(other.flush())
+        return original(values, **kwargs)
+    monkeypatch.setattr(worksheet, 'append_rows', append_during_other_flush)
+
+    assert journal.flush() == 2
+    assert flushed == [0]
+    assert [row[1] for row in worksheet.rows].count('Nova') == 1
+    assert journal.journal_status()['pending'] == 0
+
+def test_entries_of_an_interrupted_flush_are_sent_again(journal, worksheet):
+    journal.append(TABLE, {'Meta': 'Nova'})
+    # Instância que reservou a entrada e parou antes de confirmar o envio
+    JournaledBackend(journal.inner, path=journal.path)._claim()
+    assert journal.journal_status()['pending'] == 1
+    assert journal.flush() == 0
+
+    make_due(journal)
+    assert journal.flush() == 1
+    assert [row[1] for row in worksheet.rows].count('Nova') == 1
+
+def test_failed_attempt_records_the_error(journal, worksheet, monkeypatch):
+    journal.update_record(TABLE, (2, 'r2', None), {'Status': 'Concluído'})
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("Cota de escrita esgotada")
+    monkeypatch.setattr(journal.inner, 'locate_many', fail)
+
+    assert journal.flush() == 0
+    status = journal.journal_status()
+    assert status['pending'] == 1
+    assert status['last_error'] == "Cota de escrita esgotada"
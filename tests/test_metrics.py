@@ -0,0 +1,42 @@
+import pytest
+
+from benchmarks.fake_sheets import FakeAPIError
+from utils import metrics, scheduler
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+def test_labels_of_different_types_can_be_exported():
+    metrics.incr('sheets_errors_total', method='cell', status=429)
+    metrics.incr('sheets_errors_total', method='cell', status='erro')
+    metrics.observe('sheets_request_seconds', 0.01, method='cell', status=500)
+
+    counters, histograms = metrics.snapshot()
+    assert sorted(counter['status'] for counter in counters) == ['429', 'erro']
+    assert 'sheets_errors_total{method="cell",status="429"} 1' in metrics.export_text()
+
+def test_same_label_value_as_int_or_text_is_one_series():
+    metrics.incr('eventos_total', status=429)
+    metrics.incr('eventos_total', status='429')
+
+    counters, _ = metrics.snapshot()
+    assert [counter['valor'] for counter in counters] == [2]
+
+def test_scheduler_errors_with_and_without_status_are_counted():
+    def fail_with_status():
+        raise FakeAPIError(400, "Requisição inválida")
+
+    def fail_without_status():
+        raise ValueError("Falha local")
+
+    for fn in (fail_with_status, fail_without_status):
+        with pytest.raises(Exception):
+            scheduler.schedule('write', fn)
+
+    counters, _ = metrics.snapshot()
+    errors = {counter['status'] for counter in counters if counter['métrica'] == 'sheets_errors_total'}
+    assert errors == {'400', 'erro'}
+    metrics.export_text()
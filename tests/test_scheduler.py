@@ -0,0 +1,22 @@
+import threading
+
+from utils import scheduler
+
+def test_coalesced_read_falls_back_when_the_leader_hangs(monkeypatch):
+    monkeypatch.setattr(scheduler, 'COALESCE_WAIT', 0.05)
+    started, release = threading.Event(), threading.Event()
+
+    def hanging_read():
+        started.set()
+        release.wait(5)
+        return 'líder'
+
+    leader = threading.Thread(target=scheduler.schedule, args=('read', hanging_read), kwargs={'key': 'aba'})
+    leader.start()
+    try:
+        started.wait(5)
+        # A leitura em andamento não responde: a sessão faz a própria requisição
+        assert scheduler.schedule('read', lambda: 'direta', key='aba') == 'direta'
+    finally:
+        release.set()
+        leader.join()
@@ -0,0 +1,49 @@
+import pandas as pd
+
+from utils.search import build_search_index, search, tokenize
+
+def rank(index, query):
+    positions, scores = search(index, query)
+    return [int(position) for position, _ in sorted(zip(positions, scores), key=lambda item: -item[1])]
+
+def test_tokens_ignore_accents_case_and_punctuation():
+    tokens = tokenize(pd.Series(['Irrigação do CAFÉ, talhão 3', None]))
+    assert tokens.tolist() == [['irrigacao', 'do', 'cafe', 'talhao', '3'], []]
+
+def test_all_terms_must_match_regardless_of_accents():
+    index = build_search_index(['Poda do café', 'Colheita do café', 'Poda do milho'])
+
+    positions, _ = search(index, 'CAFE poda')
+    assert positions.tolist() == [0]
+
+def test_terms_match_prefixes_and_infixes():
+    index = build_search_index(['Adubação', 'Replantio', 'Plantio direto'])
+
+    assert search(index, 'adub')[0].tolist() == [0]
+    # Trecho no meio da palavra (a partir de NGRAM_SIZE letras)
+    assert search(index, 'lanti')[0].tolist() == [1, 2]
+    # Termos curtos casam só com o começo das palavras
+    assert search(index, 'di')[0].tolist() == [2]
+
+def test_exact_words_rank_above_prefixes_and_infixes():
+    index = build_search_index(['Replantio', 'Plantios', 'Plantio'])
+
+    assert rank(index, 'plantio') == [2, 1, 0]
+
+def test_bm25_favours_frequent_terms_in_shorter_texts():
+    index = build_search_index([
+        'Poda de formação e limpeza geral da área do talhão norte',
+        'Poda',
+        'Poda e poda de limpeza',
+    ])
+
+    assert rank(index, 'poda')[0] == 1
+    assert rank(index, 'limpeza') == [2, 0]
+
+def test_query_without_terms_and_empty_index():
+    index = build_search_index(['Poda'])
+    assert search(index, ' ,.- ') is None
+
+    empty = build_search_index([])
+    positions, scores = search(empty, 'poda')
+    assert positions.tolist() == [] and scores.tolist() == []
@@ -0,0 +1,53 @@
+import pytest
+
+from utils import sessions
+
+USER = {'Login': 'ana', 'Email': 'ana@exemplo.com', 'Tipo de Usuário': 'Administrador', 'Senha': 'hash'}
+
+@pytest.fixture(autouse=True)
+def secret(monkeypatch):
+    monkeypatch.setattr(sessions, '_secret', lambda: b'segredo de teste')
+
+def test_token_round_trip_keeps_only_session_fields():
+    user, remaining = sessions.verify_token(sessions.issue_token(USER))
+
+    assert {field: user[field] for field in sessions.SESSION_FIELDS} == {
+        'Login': 'ana', 'Email': 'ana@exemplo.com', 'Tipo de Usuário': 'Administrador'
+    }
+    assert 'Senha' not in user
+    assert 0 < remaining <= sessions.SESSION_TTL
+
+def test_tampered_or_malformed_tokens_are_rejected():
+    token = sessions.issue_token(USER)
+    payload, signature = token.split('.')
+    forged = sessions._b64encode(b'{"Login": "admin", "sid": "x", "exp": 9999999999}')
+
+    for bad in (f"{forged}.{signature}", f"{payload}.{signature[:-2]}", 'sem-ponto', None, ''):
+        assert sessions.verify_token(bad) == (None, 0)
+
+def test_expired_token_is_rejected():
+    assert sessions.verify_token(sessions.issue_token(USER, ttl=-1)) == (None, 0)
+
+def test_other_secret_invalidates_tokens(monkeypatch):
+    token = sessions.issue_token(USER)
+    monkeypatch.setattr(sessions, '_secret', lambda: b'outro segredo')
+    assert sessions.verify_token(token) == (None, 0)
+
+def test_logout_revokes_the_session_and_its_renewals():
+    token = sessions.issue_token(USER)
+    user, _ = sessions.verify_token(token)
+    renewed = sessions.issue_token(user, session_id=user['sid'])
+    other_login = sessions.issue_token(USER)
+
+    sessions.revoke_token(renewed)
+    assert sessions.verify_token(token) == (None, 0)
+    assert sessions.verify_token(renewed) == (None, 0)
+    assert sessions.verify_token(other_login)[0] is not None
+
+def test_revoking_an_invalid_token_does_nothing():
+    sessions.revoke_token('invalido')
+    sessions.revoke_token(None)
+
+def test_tokens_without_session_are_rejected():
+    payload = sessions._b64encode(b'{"Login": "ana", "exp": 9999999999}')
+    assert sessions.verify_token(f"{payload}.{sessions._sign(payload)}") == (None, 0)
@@ -0,0 +1,87 @@
+import pytest
+
+from conftest import SPREADSHEET_URL
+from utils.google_sheets import ROW_ID_COLUMN
+from utils.journal import JournaledBackend
+from utils.sqlite_store import SQLiteBackend
+from utils.storage import SheetsBackend, StorageBackend
+
+TABLE = 'Cronograma'
+HEADERS = ['ID', 'Meta', 'Login']
+ROWS = [['r2', 'Plantio', 'Ana'], ['r3', 'Poda', 'bruno'], ['r4', 'Colheita', 'Carla'], ['r5', 'Poda', 'Davi']]
+
+@pytest.fixture
+def local(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'storage.sqlite3'))
+    backend.load_table(TABLE, HEADERS, ROWS)
+    return backend
+
+def test_backends_implement_the_interface(tmp_path):
+    with pytest.raises(TypeError):
+        StorageBackend()
+    sheets = SheetsBackend(SPREADSHEET_URL)
+    for backend in (sheets, SQLiteBackend(str(tmp_path / 's.sqlite3')),
+                    JournaledBackend(sheets, path=str(tmp_path / 'j.sqlite3'))):
+        assert isinstance(backend, StorageBackend)
+
+def test_read_and_fetch_row(local):
+    df = local.read(TABLE)
+    assert df['Meta'].tolist() == ['Plantio', 'Poda', 'Colheita', 'Poda']
+    assert local.read(TABLE, columns=['Meta']).columns.tolist() == ['Meta']
+    assert local.fetch_row(TABLE, 3) == dict(zip(HEADERS, ROWS[1]))
+    assert local.headers('Inexistente') is None
+
+def test_lookup_ignores_case(local):
+    assert local.lookup(TABLE, 'Login', 'BRUNO')['ID'] == 'r3'
+    assert local.lookup(TABLE, 'Login', 'ninguém') is None
+
+def test_locate_by_id_or_by_content(local):
+    assert local.locate(TABLE, 2, row_id='r4') == 4
+    assert local.locate(TABLE, 2, row_id='inexistente') is None
+    assert local.locate(TABLE, 3, expected_values={'Meta': 'Poda'}) == 3
+    assert local.locate(TABLE, 3, expected_values={'Meta': 'Plantio'}) is None
+
+def test_append_generates_an_id(local):
+    assert local.append(TABLE, {'Meta': 'Adubação', 'Login': 'Eva'})
+    row = local.fetch_row(TABLE, 6)
+    assert row['Meta'] == 'Adubação' and row[ROW_ID_COLUMN].startswith('r')
+
+def test_update_and_delete_renumber_rows(local):
+    assert local.update(TABLE, {3: {'Meta': 'Desbaste'}})
+    assert local.fetch_row(TABLE, 3)['Meta'] == 'Desbaste'
+
+    assert local.delete_many(TABLE, [2, 4])
+    assert local.read(TABLE)['ID'].tolist() == ['r3', 'r5']
+    assert local.locate(TABLE, None, row_id='r5') == 3
+
+def test_records_are_updated_and_deleted_by_target(local):
+    assert local.update_record(TABLE, (9, 'r4', None), {'Meta': 'Inventário'}) == 4
+    assert local.delete_records(TABLE, [(2, 'r2', None), (9, 'r5', None)]) == [2, 5]
+    assert local.read(TABLE)['Meta'].tolist() == ['Poda', 'Inventário']
+    assert local.delete_records(TABLE, [(2, 'removido', None)]) is None
+
+def test_id_column_is_added_to_local_tables(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'storage.sqlite3'))
+    backend.load_table(TABLE, ['Meta'], [['A'], ['B']])
+
+    assert backend.ensure_row_ids(TABLE)
+    ids = backend.read(TABLE)[ROW_ID_COLUMN].tolist()
+    assert len(set(ids)) == 2 and all(ids)
+    assert backend.locate(TABLE, None, row_id=ids[1]) == 3
+
+def test_sync_and_writes_follow_the_sheet(spreadsheet, tmp_path):
+    worksheet = spreadsheet.add_worksheet_with_rows(TABLE, [HEADERS] + ROWS)
+    backend = SQLiteBackend(str(tmp_path / 'storage.sqlite3'), primary=SheetsBackend(SPREADSHEET_URL))
+
+    assert backend.read(TABLE)['ID'].tolist() == ['r2', 'r3', 'r4', 'r5']
+    assert backend.sync(TABLE) is False
+
+    assert backend.update_record(TABLE, (4, 'r4', None), {'Meta': 'Viveiro'}) == 4
+    assert backend.delete_records(TABLE, [(2, 'r2', None)]) == [2]
+    assert worksheet.rows[1:] == [ROWS[1], ['r4', 'Viveiro', 'Carla'], ROWS[3]]
+    assert backend.read(TABLE)['Meta'].tolist() == ['Poda', 'Viveiro', 'Poda']
+
+    # Alterações feitas direto na planilha chegam pela sincronização
+    worksheet.append_rows([['r6', 'Meta externa', 'Fábio']])
+    assert backend.sync(TABLE) is True
+    assert backend.lookup(TABLE, 'Login', 'fábio')['ID'] == 'r6'
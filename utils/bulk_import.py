@@ -0,0 +1,159 @@
+import hashlib
+import io
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from utils.google_sheets import ROW_ID_COLUMN
+from utils.local_mirror import load_checkpoint, save_checkpoint, clear_checkpoint
+from utils.metrics import incr, instrument
+
+# Linhas enviadas por requisição append_rows
+IMPORT_CHUNK_SIZE = 500
+# Extensões aceitas na importação
+IMPORT_FILE_TYPES = ['csv', 'xlsx']
+
+def _normalize_name(name):
+    """Normaliza um nome de coluna (sem acentos, maiúsculas ou espaços extras)"""
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.casefold().split())
+
+def file_key(content, *target):
+    """Identifica uma importação (conteúdo do arquivo + destino, ex.: planilha e aba)"""
+    digest = hashlib.sha1(content)
+    for part in target:
+        digest.update(f"\x1f{part}".encode())
+    return digest.hexdigest()
+
+def read_upload(name, content):
+    """
+    Lê um arquivo CSV ou XLSX como texto (todas as células como string)
+
+    Raises:
+        ValueError: Formato não suportado ou arquivo ilegível
+    """
+    extension = name.rsplit('.', 1)[-1].lower()
+    try:
+        if extension == 'csv':
+            # Detecta o separador (vírgula ou ponto e vírgula, comum no Excel em português)
+            return pd.read_csv(
+                io.BytesIO(content), sep=None, engine='python', dtype=str,
+                keep_default_na=False, encoding='utf-8-sig'
+            )
+        if extension == 'xlsx':
+            return pd.read_excel(io.BytesIO(content), dtype=str, keep_default_na=False)
+    except ImportError as e:
+        raise ValueError(f"Dependência ausente para ler {extension.upper()}: {str(e)}")
+    except Exception as e:
+        raise ValueError(f"Não foi possível ler o arquivo: {str(e)}")
+    raise ValueError(f"Formato não suportado: .{extension}")
+
+def map_columns(df, headers):
+    """
+    Associa as colunas do arquivo aos cabeçalhos da planilha (ignorando
+    acentos, maiúsculas e espaços)
+
+    Returns:
+        (DataFrame com exatamente as colunas de headers, na mesma ordem,
+         colunas do arquivo sem correspondência)
+    """
+    by_name = {}
+    for column in df.columns:
+        by_name.setdefault(_normalize_name(column), column)
+
+    mapping = {}
+    for header in headers:
+        source = by_name.pop(_normalize_name(header), None)
+        if source is not None:
+            mapping[header] = source
+
+    mapped = pd.DataFrame(
+        {header: df[mapping[header]] if header in mapping else '' for header in headers},
+        index=df.index
+    )
+    mapped = mapped.fillna('').astype(str).apply(lambda col: col.str.strip())
+    return mapped, list(by_name.values())
+
+def validate_rows(df, required):
+    """
+    Separa as linhas válidas das que têm campos obrigatórios vazios
+
+    Returns:
+        (linhas válidas, linhas inválidas com a coluna 'Campos ausentes')
+    """
+    present = [col for col in required if col in df.columns]
+    missing = df[present].eq('') if present else pd.DataFrame(index=df.index)
+    for col in required:
+        if col not in present:
+            missing[col] = True
+    invalid = missing.any(axis=1)
+
+    rejected = df[invalid].copy()
+    if not rejected.empty:
+        # Lista, por linha, os nomes das colunas vazias
+        names = np.array(required, dtype=object)
+        rejected.insert(0, 'Campos ausentes', [
+            ', '.join(names[flags]) for flags in missing[required].to_numpy()[invalid.to_numpy()]
+        ])
+    return df[~invalid], rejected
+
+def prepare_import(df, storage, table, required, defaults=None):
+    """
+    Converte o arquivo lido nas linhas a adicionar na aba
+
+    Args:
+        storage: Backend de armazenamento (ver utils/storage.py)
+        table: Aba de destino
+        defaults: Valores usados nas células vazias (ex.: {'Status': 'Pendente'})
+
+    Returns:
+        (linhas prontas para append_rows, linhas rejeitadas, colunas ignoradas)
+        ou (None, None, None) se não for possível ler os cabeçalhos
+    """
+    headers = storage.headers(table)
+    if not headers:
+        return None, None, None
+
+    mapped, ignored = map_columns(df, headers)
+    for column, value in (defaults or {}).items():
+        if column in mapped.columns:
+            mapped[column] = mapped[column].mask(mapped[column].eq(''), value)
+
+    valid, rejected = validate_rows(mapped, required)
+    if ROW_ID_COLUMN in valid.columns:
+        # Linhas sem ID recebem um identificador novo, como no cadastro individual
+        empty = valid[ROW_ID_COLUMN].eq('')
+        valid = valid.assign(**{ROW_ID_COLUMN: valid[ROW_ID_COLUMN].mask(
+            empty, pd.Series([storage.new_row_id() for _ in range(int(empty.sum()))], index=valid.index[empty])
+        )})
+    return valid.to_numpy().tolist(), rejected, ignored
+
+@instrument
+def run_import(storage, table, rows, key, chunk_size=IMPORT_CHUNK_SIZE, on_progress=None):
+    """
+    Adiciona as linhas em lotes, registrando o progresso a cada lote para
+    que uma importação interrompida continue de onde parou
+
+    Returns:
+        Total de linhas gravadas (igual a len(rows) quando concluída)
+    """
+    done, total = load_checkpoint(key)
+    if total != len(rows):
+        done = 0
+    if on_progress:
+        on_progress(done, len(rows))
+    progress = {'done': done}
+
+    def checkpoint(count):
+        save_checkpoint(key, count, len(rows))
+        incr('import_rows_total', value=count - progress['done'], worksheet=table)
+        progress['done'] = count
+        if on_progress:
+            on_progress(count, len(rows))
+
+    done = storage.append_rows(table, rows, chunk_size, start=done, on_chunk=checkpoint)
+    if done >= len(rows):
+        clear_checkpoint(key)
+    return done
@@ -0,0 +1,157 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.metrics import incr, instrument
+
+# Colunas pelas quais o progresso é agrupado no painel
+GROUP_COLUMNS = ('Setor', 'Responsável')
+# Colunas de situação e de prazo dos registros
+STATUS_COLUMN = 'Status'
+DEADLINE_COLUMN = 'Prazo'
+# Status que conta como concluído
+DONE_STATUS = 'Concluído'
+# Contadores do painel por valor de Status
+STATUS_COUNTS = {'Concluído': 'Concluídos', 'Em andamento': 'Em andamento', 'Pendente': 'Pendentes'}
+# Resumos mantidos em memória (um por versão dos dados)
+SUMMARY_CACHE_SIZE = 16
+
+# Resumos por versão dos dados, compartilhados pelas sessões do processo
+_summaries_lock = threading.Lock()
+_summaries = OrderedDict()
+
+def deadlines(df):
+    """Coluna Prazo como datas (valores inválidos viram NaT)"""
+    if DEADLINE_COLUMN not in df.columns:
+        return pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    series = df[DEADLINE_COLUMN]
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series
+    return pd.to_datetime(series.astype(str), errors='coerce', dayfirst=True, format='mixed')
+
+def _factorize(df, column):
+    """
+    Códigos inteiros de cada linha e rótulos (texto) de cada código. Colunas
+    categóricas reaproveitam os códigos da carga, sem converter linha a linha.
+    """
+    if column not in df.columns:
+        return np.zeros(len(df), dtype=np.int64), pd.Index([''], dtype=object)
+    series = df[column]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, labels = series.cat.codes.to_numpy(dtype=np.int64), series.cat.categories
+    else:
+        codes, labels = pd.factorize(series, sort=False)
+    labels = pd.Index(np.asarray(labels, dtype=object).astype(str), dtype=object)
+    if (codes < 0).any():
+        # Valores vazios ficam em um rótulo próprio
+        codes = np.where(codes < 0, len(labels), codes)
+        labels = labels.append(pd.Index([''], dtype=object))
+    return codes, labels
+
+def _status_masks(df, values):
+    """Para cada valor informado, as linhas com esse Status (um único factorize)"""
+    codes, labels = _factorize(df, STATUS_COLUMN)
+    return {value: np.asarray(labels == value)[codes] for value in values}
+
+def overdue_mask(df, today, done=None):
+    """Linhas com prazo vencido e ainda não concluídas (vetorizado)"""
+    if done is None:
+        done = _status_masks(df, [DONE_STATUS])[DONE_STATUS]
+    return (deadlines(df) < today).to_numpy() & ~done
+
+def row_counts(df, today):
+    """Contribuição de cada linha para os contadores do painel (0 ou 1 por coluna)"""
+    masks = _status_masks(df, set(STATUS_COUNTS) | {DONE_STATUS})
+    counts = {'Total': np.ones(len(df), dtype=np.int64)}
+    for value, label in STATUS_COUNTS.items():
+        counts[label] = masks[value].astype(np.int64)
+    counts['Atrasados'] = overdue_mask(df, today, masks[DONE_STATUS]).astype(np.int64)
+    return pd.DataFrame(counts, index=df.index)
+
+def _group_counts(df, counts, column):
+    """Soma dos contadores por valor da coluna (np.bincount sobre os códigos)"""
+    codes, labels = _factorize(df, column)
+    table = pd.DataFrame({
+        name: np.bincount(codes, weights=counts[name].to_numpy(), minlength=len(labels)).astype(np.int64)
+        for name in counts.columns
+    }, index=labels)
+    if not table.index.is_unique:
+        table = table.groupby(level=0, sort=False).sum()
+    # Categorias sem nenhuma linha não entram no painel
+    return table[table['Total'] > 0]
+
+@instrument
+def build_summary(df, today):
+    """
+    Calcula os contadores do painel: totais gerais e por valor de cada
+    coluna de GROUP_COLUMNS (um groupby por coluna, sem laços por linha)
+    """
+    counts = row_counts(df, today)
+    return {
+        'today': today,
+        'totals': counts.sum(),
+        'groups': {column: _group_counts(df, counts, column) for column in GROUP_COLUMNS}
+    }
+
+def apply_row_change(summary, before, after):
+    """
+    Novo resumo a partir de um anterior, descontando as linhas `before` e
+    somando as linhas `after` (ex.: a mesma linha antes e depois da edição)
+    """
+    today = summary['today']
+    old_counts, new_counts = row_counts(before, today), row_counts(after, today)
+    groups = {}
+    for column, table in summary['groups'].items():
+        delta = _group_counts(after, new_counts, column).sub(
+            _group_counts(before, old_counts, column), fill_value=0
+        )
+        table = table.add(delta, fill_value=0).astype(np.int64)
+        # Grupos que ficaram sem registros saem do painel
+        groups[column] = table[table['Total'] > 0]
+    return {
+        'today': today,
+        'totals': summary['totals'] - old_counts.sum() + new_counts.sum(),
+        'groups': groups
+    }
+
+def _remember(version, summary):
+    with _summaries_lock:
+        _summaries[version] = summary
+        _summaries.move_to_end(version)
+        while len(_summaries) > SUMMARY_CACHE_SIZE:
+            _summaries.popitem(last=False)
+
+def get_summary(df, today):
+    """Resumo do painel para os dados, calculado uma única vez por versão (e dia)"""
+    version = df.attrs.get('data_version')
+    with _summaries_lock:
+        summary = _summaries.get(version)
+    if summary is not None and summary['today'] == today:
+        incr('cache_events_total', cache='dashboard', result='hit')
+        return summary
+
+    incr('cache_events_total', cache='dashboard', result='miss')
+    summary = build_summary(df, today)
+    if version is not None:
+        _remember(version, summary)
+    return summary
+
+def record_row_change(old_version, new_version, before, after):
+    """
+    Registra uma edição ou exclusão pontual: se o resumo da versão anterior
+    estiver em memória, o da nova versão é derivado dele sem recalcular tudo
+    """
+    with _summaries_lock:
+        summary = _summaries.get(old_version)
+    if summary is None or new_version is None:
+        return
+    _remember(new_version, apply_row_change(summary, before, after))
+    incr('cache_events_total', cache='dashboard', result='incremental')
+
+def progress_table(counts):
+    """Tabela de exibição de um agrupamento, com o percentual concluído"""
+    table = counts.copy()
+    table['% Concluído'] = np.where(table['Total'] > 0, 100 * table['Concluídos'] / table['Total'].clip(lower=1), 0.0)
+    return table.sort_values(['Total', '% Concluído'], ascending=False)
@@ -0,0 +1,218 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from utils.metrics import incr
+
+# Validade (segundos) de um DataFrame em cache
+CACHE_TTL = 300
+# Fração da validade a partir da qual a recarga é antecipada em segundo plano
+REFRESH_AHEAD = 0.8
+# Idade máxima (em múltiplos da validade) de uma cópia servida enquanto recarrega
+MAX_STALE_FACTOR = 3
+# Espera (segundos) antes de reconciliar o cache com a planilha após uma escrita
+RECONCILE_DELAY = 5
+# Intervalo (segundos) entre as verificações do atualizador em segundo plano
+REFRESH_INTERVAL = 30
+# Threads usadas para as cargas em segundo plano
+REFRESH_WORKERS = 4
+
+# Cache compartilhado pelo processo: chave -> entrada
+# Os DataFrames em cache nunca são alterados no lugar (cópia na escrita),
+# então sessões que ainda leem uma versão antiga não são afetadas.
+_store_lock = threading.RLock()
+_entries = {}
+_load_locks = {}
+_refreshing = set()
+_reconcile_timer = None
+_refresher = None
+_executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix='data-refresh')
+
+def frame_version(df):
+    """Gera uma assinatura do conteúdo do DataFrame (muda quando os dados mudam)"""
+    digest = hashlib.sha1()
+    digest.update("\x1f".join(map(str, df.columns)).encode())
+    if not df.empty:
+        digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return digest.hexdigest()
+
+def _stamp(df):
+    """Registra a versão dos dados no próprio DataFrame"""
+    df.attrs['data_version'] = frame_version(df)
+    return df
+
+def _load_lock(key):
+    """Trava por chave, para que sessões concorrentes façam uma única carga"""
+    with _store_lock:
+        return _load_locks.setdefault(key, threading.Lock())
+
+def _has_pending(entry):
+    """A cópia em cache tem escritas ainda não gravadas na fonte"""
+    return entry['pending'] is not None and bool(entry['pending']())
+
+def get_frame(key, loader, ttl=CACHE_TTL, pending=None):
+    """
+    Retorna o DataFrame em cache para a chave. O resultado é compartilhado:
+    não modificar.
+
+    Perto de expirar, a entrada é recarregada em segundo plano e a cópia
+    anterior continua sendo servida até a nova ficar pronta. A carga só é
+    feita de forma síncrona quando não há cópia (ou ela está velha demais).
+
+    pending(), se informada, indica escritas já aplicadas à cópia em cache
+    mas ainda não gravadas na fonte (ex.: no diário de escritas); enquanto
+    houver, a cópia não é substituída por uma recarga.
+    """
+    with _store_lock:
+        entry = _entries.get(key)
+    if entry:
+        age = time.time() - entry['loaded_at']
+        if age >= ttl * REFRESH_AHEAD:
+            refresh_async(key)
+        if age < ttl * MAX_STALE_FACTOR or _has_pending(entry):
+            incr('cache_events_total', cache='data', result='hit' if age < ttl else 'stale')
+            return entry['df']
+
+    incr('cache_events_total', cache='data', result='miss')
+    with _load_lock(key):
+        # Outra sessão (ou a pré-carga) pode ter concluído a carga enquanto esperávamos
+        with _store_lock:
+            entry = _entries.get(key)
+        if entry and time.time() - entry['loaded_at'] < ttl * MAX_STALE_FACTOR:
+            return entry['df']
+
+        df = loader()
+        if df is None:
+            # Falhas não ficam em cache; a próxima leitura tenta de novo
+            return entry['df'] if entry else None
+
+        with _store_lock:
+            generation = entry['generation'] + 1 if entry else 0
+            _entries[key] = {
+                'df': _stamp(df),
+                'loader': loader,
+                'ttl': ttl,
+                'pending': pending,
+                'loaded_at': time.time(),
+                'generation': generation
+            }
+        return df
+
+def _refresh(key):
+    """Recarrega uma entrada e substitui a cópia em cache quando pronta"""
+    try:
+        with _store_lock:
+            entry = _entries.get(key)
+            if entry is None:
+                return
+            loader, generation = entry['loader'], entry['generation']
+        # A fonte ainda não tem todas as escritas: a cópia em cache é mais recente
+        if _has_pending(entry):
+            return
+
+        with _load_lock(key):
+            df = loader()
+        # Escritas feitas durante a carga: a reconciliação fica para depois do envio
+        if df is None or _has_pending(entry):
+            return
+
+        with _store_lock:
+            entry = _entries.get(key)
+            if entry is None:
+                return
+            if entry['generation'] != generation:
+                # Houve uma escrita durante a carga: reconcilia de novo depois
+                schedule_reconcile()
+                return
+            entry.update(df=_stamp(df), loaded_at=time.time(), generation=generation + 1)
+    finally:
+        with _store_lock:
+            _refreshing.discard(key)
+
+def refresh_async(key):
+    """Agenda a recarga de uma entrada em segundo plano (se ainda não agendada)"""
+    with _store_lock:
+        if key in _refreshing or key not in _entries:
+            return
+        _refreshing.add(key)
+    _executor.submit(_refresh, key)
+
+def prefetch(tasks):
+    """Executa as cargas informadas em paralelo, em segundo plano"""
+    return [_executor.submit(task) for task in tasks]
+
+def patch_frames(patch, keys=None):
+    """
+    Aplica patch(df) -> novo DataFrame às entradas em cache (todas ou as
+    chaves informadas), sem recarregar a planilha
+    """
+    with _store_lock:
+        for key, entry in _entries.items():
+            if keys is not None and key not in keys:
+                continue
+            patched = patch(entry['df'])
+            if patched is not entry['df']:
+                entry['df'] = _stamp(patched)
+                entry['generation'] += 1
+
+def invalidate(keys=None):
+    """Descarta as entradas informadas (ou todas) do cache"""
+    with _store_lock:
+        if keys is None:
+            _entries.clear()
+        else:
+            for key in keys:
+                _entries.pop(key, None)
+
+def _reconcile():
+    """Recarrega em segundo plano as entradas em cache a partir da planilha"""
+    global _reconcile_timer
+    with _store_lock:
+        _reconcile_timer = None
+        keys = list(_entries)
+    for key in keys:
+        refresh_async(key)
+
+def schedule_reconcile(delay=RECONCILE_DELAY):
+    """Agenda (uma única vez) a reconciliação do cache com a planilha"""
+    global _reconcile_timer
+    with _store_lock:
+        if _reconcile_timer is not None:
+            return
+        _reconcile_timer = threading.Timer(delay, _reconcile)
+        _reconcile_timer.daemon = True
+        _reconcile_timer.start()
+
+def start_refresher(periodic_tasks=(), interval=REFRESH_INTERVAL):
+    """
+    Inicia (uma vez por processo) o atualizador em segundo plano: recarrega
+    as entradas perto de expirar e executa as tarefas periódicas informadas
+    como pares (função, período em segundos)
+    """
+    global _refresher
+    with _store_lock:
+        if _refresher is not None:
+            return
+        last_run = {i: time.time() for i in range(len(periodic_tasks))}
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                now = time.time()
+                with _store_lock:
+                    due = [
+                        key for key, entry in _entries.items()
+                        if now - entry['loaded_at'] >= entry['ttl'] * REFRESH_AHEAD
+                    ]
+                for key in due:
+                    refresh_async(key)
+                for i, (task, period) in enumerate(periodic_tasks):
+                    if now - last_run[i] >= period:
+                        last_run[i] = now
+                        _executor.submit(task)
+
+        _refresher = threading.Thread(target=loop, name='data-refresher', daemon=True)
+        _refresher.start()
@@ -0,0 +1,84 @@
+import io
+import tempfile
+
+from utils.metrics import incr, instrument
+
+# Linhas convertidas por vez durante a exportação
+EXPORT_CHUNK_ROWS = 5000
+# Tamanho (bytes) a partir do qual o arquivo em geração vai para o disco
+EXPORT_SPOOL_SIZE = 8 * 2 ** 20
+# Formatos de exportação: extensão -> (rótulo, tipo MIME)
+EXPORT_FORMATS = {
+    'csv': ('CSV', 'text/csv'),
+    'xlsx': ('Excel (XLSX)', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'parquet': ('Parquet', 'application/vnd.apache.parquet'),
+}
+
+def iter_chunks(df, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Percorre o DataFrame em fatias de chunk_rows linhas (sem copiar o todo)"""
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+def _write_csv(df, out, chunk_rows):
+    # utf-8-sig para o Excel reconhecer os acentos ao abrir o CSV
+    text = io.TextIOWrapper(out, encoding='utf-8-sig', newline='')
+    df.iloc[:0].to_csv(text, index=False)
+    for chunk in iter_chunks(df, chunk_rows):
+        chunk.to_csv(text, index=False, header=False)
+    text.flush()
+    text.detach()
+
+def _write_xlsx(df, out, chunk_rows):
+    from openpyxl import Workbook
+
+    # Modo somente escrita: as linhas não ficam em memória depois de gravadas
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Cronograma")
+    sheet.append([str(col) for col in df.columns])
+    for chunk in iter_chunks(df, chunk_rows):
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            sheet.append(row)
+    workbook.save(out)
+
+def _write_parquet(df, out, chunk_rows):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+    with pq.ParquetWriter(out, schema) as writer:
+        for chunk in iter_chunks(df, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+_WRITERS = {'csv': _write_csv, 'xlsx': _write_xlsx, 'parquet': _write_parquet}
+
+@instrument
+def export_frame(df, fmt, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Gera o arquivo de exportação do DataFrame, convertendo-o em fatias
+
+    Args:
+        df: DataFrame a exportar (não é modificado nem copiado por inteiro)
+        fmt: Extensão do formato ('csv', 'xlsx' ou 'parquet')
+
+    Returns:
+        Conteúdo do arquivo exportado (bytes). Durante a conversão, as fatias
+        já convertidas vão para um arquivo temporário, e não para a memória.
+
+    Raises:
+        ValueError: Formato desconhecido ou biblioteca do formato ausente
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"Formato de exportação desconhecido: {fmt}")
+
+    # Colunas internas (ex.: _original_index) não são exportadas
+    df = df[[col for col in df.columns if not str(col).startswith('_')]]
+    with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE) as out:
+        try:
+            _WRITERS[fmt](df, out, chunk_rows)
+        except ImportError as e:
+            raise ValueError(f"Dependência ausente para exportar {fmt.upper()}: {str(e)}")
+        out.seek(0)
+        content = out.read()
+    incr('export_rows_total', value=len(df), format=fmt)
+    return content
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+from utils.search import build_search_index, search
+
+# Colunas filtradas por busca textual em vez de igualdade exata
+SEARCH_COLUMNS = ('Descrição Meta',)
+
+def build_facet_index(df, columns):
+    """
+    Monta o índice de facetas de uma carga de dados.
+    Para cada coluna guarda os códigos categóricos de cada linha e, para cada
+    valor, o intervalo em `order` com as posições (ordenadas) das suas linhas.
+    Colunas de busca textual recebem um índice invertido (utils/search.py).
+    """
+    index = {'size': len(df), 'columns': {}, 'search': {}}
+    for column in columns:
+        if column not in df.columns:
+            continue
+        series = df[column]
+        if column in SEARCH_COLUMNS:
+            index['search'][column] = build_search_index(series)
+            continue
+        # Colunas já tipadas na carga (categoria/texto) não são convertidas de novo
+        if not (isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(series.dtype)):
+            series = series.astype(str)
+        # sort=False preserva a ordem de primeira ocorrência, como unique()
+        codes, categories = pd.factorize(series, sort=False)
+        codes = codes.astype(np.int32)
+        counts = np.bincount(codes, minlength=len(categories))
+        index['columns'][column] = {
+            'codes': codes,
+            'categories': pd.Index(np.asarray(categories, dtype=object)),
+            'lookup': {value: code for code, value in enumerate(categories)},
+            'order': np.argsort(codes, kind='stable'),
+            'bounds': np.concatenate(([0], np.cumsum(counts)))
+        }
+    return index
+
+def _matching_codes(column_index, value):
+    """Códigos das categorias que satisfazem a seleção de uma coluna"""
+    code = column_index['lookup'].get(str(value))
+    return np.array([], dtype=np.int64) if code is None else np.array([code])
+
+def _value_positions(column_index, codes):
+    """Posições (ordenadas) das linhas com algum dos códigos informados"""
+    if len(codes) == 1:
+        code = codes[0]
+        bounds = column_index['bounds']
+        return column_index['order'][bounds[code]:bounds[code + 1]]
+    return np.flatnonzero(np.isin(column_index['codes'], codes))
+
+def facet_positions(index, selections, ranked=False):
+    """
+    Retorna as posições das linhas que atendem a todas as seleções,
+    ou None quando nenhuma seleção restringe os dados.
+    Com ranked=True, havendo busca textual, as posições vêm ordenadas pela
+    relevância; caso contrário, em ordem crescente.
+    """
+    positions = None
+    scores = None
+    for column, value in selections.items():
+        if value == "Todos":
+            continue
+        if column in index['search']:
+            found = search(index['search'][column], value)
+            if found is None:
+                continue
+            selected = found[0]
+            if ranked:
+                column_scores = np.zeros(index['size'])
+                column_scores[found[0]] = found[1]
+                scores = column_scores if scores is None else scores + column_scores
+        elif column in index['columns']:
+            column_index = index['columns'][column]
+            selected = _value_positions(column_index, _matching_codes(column_index, value))
+        else:
+            continue
+        if positions is None:
+            positions = selected
+        else:
+            positions = np.intersect1d(positions, selected, assume_unique=True)
+    if scores is not None:
+        positions = positions[np.argsort(-scores[positions], kind='stable')]
+    return positions
+
+def facet_values(index, column, selections=None):
+    """
+    Valores disponíveis de uma coluna dadas as seleções das demais,
+    na ordem de primeira ocorrência
+    """
+    column_index = index['columns'][column]
+    positions = facet_positions(index, selections or {})
+    if positions is None:
+        return list(column_index['categories'])
+
+    codes = column_index['codes'][positions]
+    unique_codes, first_seen = np.unique(codes, return_index=True)
+    ordered = unique_codes[np.argsort(first_seen)]
+    return list(column_index['categories'][ordered])
@@ -0,0 +1,77 @@
+import threading
+from collections import OrderedDict
+
+from utils.metrics import incr
+
+# Resultados de filtros (posições e listas de opções) mantidos em memória
+FILTER_CACHE_SIZE = 256
+# Versões dos dados com resultados em cache (a atual e a anterior, ainda
+# usada por sessões que não recarregaram a página)
+FILTER_CACHE_VERSIONS = 2
+
+# Cache compartilhado pelas sessões do processo: (versão, tipo, chave) -> resultado
+_lock = threading.Lock()
+_entries = OrderedDict()
+_versions = OrderedDict()
+_MISSING = object()
+
+def normalize_selection(selections, search_columns=()):
+    """
+    Tupla canônica de uma seleção de filtros: ignora os "Todos", não depende
+    da ordem das colunas e, nas buscas textuais, de espaços e maiúsculas
+    """
+    normalized = []
+    for column, value in (selections or {}).items():
+        if value == "Todos":
+            continue
+        value = str(value)
+        if column in search_columns:
+            value = ' '.join(value.split()).casefold()
+        normalized.append((column, value))
+    return tuple(sorted(normalized))
+
+def _base(version):
+    # As visões por usuário ("versão:e-mail") derivam da cópia compartilhada
+    return str(version).split(':', 1)[0]
+
+def memoize(version, kind, key, compute):
+    """
+    Retorna o resultado em cache para (versão dos dados, tipo, chave) ou o
+    calcula com compute(). Quando a cópia compartilhada muda de versão, os
+    resultados das versões mais antigas que FILTER_CACHE_VERSIONS são
+    descartados. Resultados em cache são compartilhados: não modificar.
+    """
+    if version is None:
+        return compute()
+
+    entry_key = (version, kind, key)
+    with _lock:
+        base = _base(version)
+        if base not in _versions:
+            _versions[base] = True
+            while len(_versions) > FILTER_CACHE_VERSIONS:
+                stale, _ = _versions.popitem(last=False)
+                for k in [k for k in _entries if _base(k[0]) == stale]:
+                    del _entries[k]
+        result = _entries.get(entry_key, _MISSING)
+        if result is not _MISSING:
+            _entries.move_to_end(entry_key)
+    if result is not _MISSING:
+        incr('cache_events_total', cache='filters', result='hit')
+        return result
+
+    incr('cache_events_total', cache='filters', result='miss')
+    result = compute()
+    with _lock:
+        # Uma versão descartada durante o cálculo não volta para o cache
+        if base in _versions:
+            _entries[entry_key] = result
+            while len(_entries) > FILTER_CACHE_SIZE:
+                _entries.popitem(last=False)
+    return result
+
+def clear():
+    """Descarta todos os resultados em cache"""
+    with _lock:
+        _entries.clear()
+        _versions.clear()
@@ -1,89 +1,550 @@
+import re
+import threading
+import time
+import uuid
+
 import gspread
 import streamlit as st
 from oauth2client.service_account import ServiceAccountCredentials
+from requests.adapters import HTTPAdapter
 import pandas as pd
 
+from utils.local_mirror import load_mirror, save_mirror
+from utils.metrics import incr, instrument
+from utils.scheduler import schedule
+from utils.schema import apply_schema
+
+SCOPE = [
+    'https://www.googleapis.com/auth/spreadsheets',
+    'https://www.googleapis.com/auth/drive'
+]
+
+# Tamanho do pool de conexões HTTP compartilhado entre as sessões
+HTTP_POOL_SIZE = 32
+# Tempo máximo (segundos) para conectar e para receber a resposta da API
+HTTP_TIMEOUT = (10, 60)
+# Coluna com o identificador estável de cada linha
+ROW_ID_COLUMN = 'ID'
+# Validade (segundos) dos cabeçalhos em cache (colunas podem ser inseridas ou movidas na planilha)
+HEADERS_TTL = 60
+# Validade máxima (segundos) dos índices de busca em memória (ex.: usuários por login)
+USER_INDEX_TTL = 600
+# Idade mínima (segundos) do índice para reconstruí-lo quando uma chave não é encontrada
+USER_INDEX_MISS_REFRESH = 60
+# Coluna de login da aba de usuários
+LOGIN_COLUMN = 'Login'
+
+# Estado compartilhado pelo processo (todas as sessões do Streamlit)
+_client_lock = threading.RLock()
+_client = None
+_spreadsheets = {}
+_worksheets = {}
+_headers = {}
+_lookup_indexes = {}
+
+def _mount_connection_pool(client):
+    """Amplia o pool de conexões da sessão HTTP usada pelo cliente"""
+    session = getattr(client, 'session', None)
+    if session is None:
+        session = getattr(getattr(client, 'http_client', None), 'session', None)
+    if session is not None:
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount('https://', adapter)
+
+@instrument
+def reset_client():
+    """Descarta o cliente e os handles em cache, forçando nova autorização"""
+    global _client
+    with _client_lock:
+        _client = None
+        _spreadsheets.clear()
+        _worksheets.clear()
+        _headers.clear()
+
+@instrument
+def use_client(client):
+    """
+    Substitui o cliente compartilhado por um já autorizado (ex.: o backend
+    em memória usado nos benchmarks)
+    """
+    global _client
+    reset_client()
+    with _client_lock:
+        _client = client
+
+@instrument
+def get_client():
+    """
+    Retorna o cliente gspread compartilhado pelo processo, autorizado uma
+    única vez: a sessão HTTP do gspread renova o token de acesso sozinha
+    quando ele expira, sem descartar os handles e cabeçalhos em cache.
+    """
+    global _client
+    with _client_lock:
+        if _client is not None:
+            return _client
+
+        creds_dict = dict(st.secrets["GOOGLE_CREDENTIALS"])
+        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, SCOPE)
+        client = gspread.authorize(creds)
+        # Sem limite, uma conexão travada prende a sessão (e as que aguardam a mesma leitura)
+        client.set_timeout(HTTP_TIMEOUT)
+        _mount_connection_pool(client)
+
+        # Handles antigos apontam para o cliente anterior
+        _spreadsheets.clear()
+        _worksheets.clear()
+        _headers.clear()
+        _client = client
+        return _client
+
+@instrument
 def get_google_sheet_by_url(url):
     """Conecta ao Google Sheets usando as credenciais do Streamlit secrets"""
-    scope = [
-        'https://www.googleapis.com/auth/spreadsheets',
-        'https://www.googleapis.com/auth/drive'
-    ]
-    
     try:
-        creds_dict = dict(st.secrets["GOOGLE_CREDENTIALS"])
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-        client = gspread.authorize(creds)
-        return client.open_by_url(url)
+        client = get_client()
+        with _client_lock:
+            sheet = _spreadsheets.get(url)
+        if sheet is None:
+            # A abertura é feita fora da trava (aberturas simultâneas são unificadas
+            # pelo agendador); só o resultado é guardado sob ela
+            sheet = schedule('read', client.open_by_url, url, key=('open', url))
+            with _client_lock:
+                # Handles de um cliente já substituído não entram no cache
+                if _client is client:
+                    sheet = _spreadsheets.setdefault(url, sheet)
+        return sheet
     except Exception as e:
         st.error(f"Erro ao conectar ao Google Sheets: {str(e)}")
         return None
 
+@instrument
 def get_worksheet(url, worksheet_name):
     """Obtém uma aba específica da planilha"""
     try:
         sheet = get_google_sheet_by_url(url)
-        return sheet.worksheet(worksheet_name) if sheet else None
+        if not sheet:
+            return None
+        key = (url, worksheet_name)
+        with _client_lock:
+            worksheet = _worksheets.get(key)
+        if worksheet is None:
+            worksheet = schedule('read', sheet.worksheet, worksheet_name, key=('worksheet', url, worksheet_name))
+            with _client_lock:
+                # A planilha pode ter sido descartada (nova autorização) durante a leitura
+                if _spreadsheets.get(url) is sheet:
+                    worksheet = _worksheets.setdefault(key, worksheet)
+        return worksheet
     except Exception as e:
         st.error(f"Erro ao acessar aba {worksheet_name}: {str(e)}")
         return None
 
-def read_sheet_to_dataframe(url, worksheet_name, user_email=None):
-    """Lê uma planilha e retorna um DataFrame, opcionalmente filtrado por e-mail"""
+@instrument
+def get_headers(url, worksheet_name, refresh=False):
+    """
+    Retorna os cabeçalhos (linha 1) da aba, mantidos em cache por até
+    HEADERS_TTL segundos. Escritas que dependem da posição das colunas
+    usam refresh=True para conferir a ordem atual antes de gravar.
+    """
+    key = (url, worksheet_name)
+    with _client_lock:
+        entry = _headers.get(key)
+    if entry is None or refresh or time.time() - entry['fetched_at'] > HEADERS_TTL:
+        worksheet = get_worksheet(url, worksheet_name)
+        if not worksheet:
+            return None
+        headers = schedule('read', worksheet.row_values, 1, key=('headers', url, worksheet_name))
+        with _client_lock:
+            _headers[key] = {'headers': headers, 'fetched_at': time.time()}
+        return headers
+    return entry['headers']
+
+def _read_id_column(worksheet, url, worksheet_name, headers):
+    """
+    Lê a coluna de identificadores (com o cabeçalho na posição 0). Se a
+    coluna mudou de lugar desde que os cabeçalhos foram lidos, relê os
+    cabeçalhos e a coluna certa; sem a coluna, levanta um erro de leitura.
+    """
+    col = headers.index(ROW_ID_COLUMN) + 1
+    ids = schedule('read', worksheet.col_values, col, key=('column', url, worksheet_name, col))
+    if ids and ids[0] == ROW_ID_COLUMN:
+        return ids
+    headers = get_headers(url, worksheet_name, refresh=True) or []
+    if ROW_ID_COLUMN not in headers:
+        raise RuntimeError(f"Coluna {ROW_ID_COLUMN} não encontrada na aba {worksheet_name}")
+    col = headers.index(ROW_ID_COLUMN) + 1
+    return schedule('read', worksheet.col_values, col, key=('column', url, worksheet_name, col))
+
+def _row_update_ranges(headers, row_num, updated_values):
+    """
+    Converte os valores de uma linha em intervalos A1 contíguos,
+    cobrindo apenas as colunas informadas
+    """
+    if isinstance(updated_values, dict):
+        positions = {}
+        for i, header in enumerate(headers, start=1):
+            positions.setdefault(header, i)
+        cells = sorted(
+            (positions[header], value)
+            for header, value in updated_values.items()
+            if header in positions
+        )
+    else:
+        cells = list(enumerate(updated_values, start=1))
+
+    # Agrupa colunas vizinhas em um único intervalo
+    groups = []
+    for col, value in cells:
+        if groups and groups[-1]['end'] == col - 1:
+            groups[-1]['end'] = col
+            groups[-1]['values'].append(value)
+        else:
+            groups.append({'start': col, 'end': col, 'values': [value]})
+
+    return [
+        {
+            'range': f"{gspread.utils.rowcol_to_a1(row_num, g['start'])}:"
+                     f"{gspread.utils.rowcol_to_a1(row_num, g['end'])}",
+            'values': [g['values']]
+        }
+        for g in groups
+    ]
+
+@instrument
+def get_sheet_version(url):
+    """
+    Consulta barata da versão da planilha (data da última modificação no Drive).
+    Retorna None se não for possível obtê-la.
+    """
+    sheet = get_google_sheet_by_url(url)
+    if not sheet:
+        return None
+    try:
+        get_last_update = getattr(sheet, 'get_lastUpdateTime', None)
+        if get_last_update is None:
+            get_last_update = lambda: sheet.lastUpdateTime
+        return schedule('read', get_last_update, key=('version', url))
+    except Exception:
+        return None
+
+def _column_letter(col):
+    """Letra da coluna (ex.: 1 -> 'A', 27 -> 'AA')"""
+    return re.sub(r'\d', '', gspread.utils.rowcol_to_a1(1, col))
+
+def _fetch_projected(worksheet, url, worksheet_name, columns):
+    """
+    Baixa apenas as colunas informadas, em um único batch_get.
+    Retorna um dicionário coluna -> valores (sem o cabeçalho).
+    """
+    headers = get_headers(url, worksheet_name)
+    positions = sorted({headers.index(col) + 1 for col in columns if col in headers})
+    
+    # Colunas vizinhas viram um único intervalo aberto (ex.: 'A2:C')
+    groups = []
+    for col in positions:
+        if groups and groups[-1][1] == col - 1:
+            groups[-1][1] = col
+        else:
+            groups.append([col, col])
+    ranges = [f"{_column_letter(start)}2:{_column_letter(end)}" for start, end in groups]
+    
+    value_ranges = schedule(
+        'read', worksheet.batch_get, ranges,
+        major_dimension='COLUMNS',
+        key=('projection', url, worksheet_name, tuple(ranges))
+    )
+    data = {}
+    for (start, end), value_range in zip(groups, value_ranges):
+        values = list(value_range)
+        for offset, col in enumerate(range(start, end + 1)):
+            data[headers[col - 1]] = list(values[offset]) if offset < len(values) else []
+    
+    # A API omite células vazias no fim de cada coluna
+    size = max((len(values) for values in data.values()), default=0)
+    return {name: values + [''] * (size - len(values)) for name, values in data.items()}
+
+@instrument
+def fetch_records(url, worksheet_name, columns=None):
+    """
+    Retorna os registros da aba, servindo a cópia local (SQLite)
+    quando a planilha não mudou desde o último download.
+    
+    Sem projeção, retorna uma lista de dicionários (get_all_records); com
+    `columns`, baixa só essas colunas e retorna um dicionário coluna -> valores.
+    """
+    mirror_name = f"{worksheet_name}[{','.join(columns)}]" if columns else worksheet_name
+    version = get_sheet_version(url)
+    mirrored, mirrored_version = load_mirror(url, mirror_name)
+    if mirrored is not None and version is not None and version == mirrored_version:
+        incr('cache_events_total', cache='mirror', result='hit')
+        return mirrored
+    incr('cache_events_total', cache='mirror', result='miss')
+
     worksheet = get_worksheet(url, worksheet_name)
-    if worksheet:
-        try:
-            # Obter todos os registros
-            records = worksheet.get_all_records()
-            df = pd.DataFrame(records).fillna('')
-            
-            # Filtrar pelo e-mail se fornecido
-            if user_email and 'E-mail' in df.columns:
-                df = df[df['E-mail'].str.lower() == user_email.lower()]
-            
-            return df
-        except Exception as e:
-            st.error(f"Erro ao processar dados: {str(e)}")
-            return pd.DataFrame()
-    return None
+    if not worksheet:
+        if mirrored is not None:
+            st.warning("Sem conexão com a planilha: exibindo a última cópia local.")
+        return mirrored
 
-def get_user_by_login(url, worksheet_name, login):
-    """Busca usuário pelo login"""
+    try:
+        if columns:
+            # A planilha mudou: as colunas podem ter sido inseridas ou movidas,
+            # então as posições projetadas partem dos cabeçalhos atuais
+            get_headers(url, worksheet_name, refresh=True)
+            records = _fetch_projected(worksheet, url, worksheet_name, columns)
+        else:
+            records = schedule('read', worksheet.get_all_records, key=('records', url, worksheet_name))
+    except Exception:
+        if mirrored is None:
+            raise
+        st.warning("Falha ao atualizar os dados: exibindo a última cópia local.")
+        return mirrored
+
+    # Tamanho do download, em células
+    if isinstance(records, dict):
+        cells = sum(len(values) for values in records.values())
+    else:
+        cells = len(records) * len(records[0]) if records else 0
+    incr('sheets_payload_cells_total', cells, worksheet=worksheet_name)
+
+    # A versão foi lida antes do download, então uma alteração concorrente
+    # apenas provoca um novo download na próxima verificação
+    if version is not None:
+        save_mirror(url, mirror_name, records, version)
+    return records
+
+@instrument
+def fetch_row(url, worksheet_name, row_num):
+    """Lê uma única linha completa da aba, como dicionário cabeçalho -> valor"""
     worksheet = get_worksheet(url, worksheet_name)
-    if worksheet:
-        try:
-            for record in worksheet.get_all_records():
-                if record and 'Login' in record and str(record.get('Login', '')).lower() == login.lower():
-                    return record
-        except Exception as e:
-            st.error(f"Erro ao buscar usuário: {str(e)}")
-    return None
+    if not worksheet:
+        return None
+    try:
+        headers = get_headers(url, worksheet_name)
+        values = schedule('read', worksheet.row_values, row_num)
+        values = values + [''] * (len(headers) - len(values))
+        return dict(zip(headers, values))
+    except Exception as e:
+        st.error(f"Erro ao ler linha: {str(e)}")
+        return None
+
+@instrument
+def new_row_id():
+    """Gera um identificador estável para uma nova linha"""
+    # O prefixo evita que o valor seja interpretado como número pela planilha
+    return f"r{uuid.uuid4().hex[:12]}"
+
+def _locate_row(url, worksheet_name, headers, expected_row, row_id=None, expected_values=None):
+    """
+    Localiza a linha (ver locate_row). Retorna None se o registro não for
+    encontrado; erros de leitura são propagados, para não serem confundidos
+    com um registro removido.
+    """
+    worksheet = get_worksheet(url, worksheet_name)
+    if not worksheet:
+        raise RuntimeError(f"Aba não encontrada: {worksheet_name}")
+    
+    if row_id and ROW_ID_COLUMN in headers:
+        col = headers.index(ROW_ID_COLUMN) + 1
+        if expected_row and expected_row >= 2:
+            cell = schedule('read', worksheet.cell, expected_row, col)
+            if str(cell.value or '') == str(row_id):
+                return expected_row
+        ids = _read_id_column(worksheet, url, worksheet_name, headers)
+        for row_num, value in enumerate(ids[1:], start=2):
+            if str(value) == str(row_id):
+                return row_num
+        return None
+    
+    if not expected_row or expected_row < 2:
+        return None
+    values = schedule('read', worksheet.row_values, expected_row)
+    current = dict(zip(headers, values))
+    for column, value in (expected_values or {}).items():
+        if column in headers and str(current.get(column, '')) != str(value):
+            return None
+    return expected_row
 
-def register_user(url, worksheet_name, user_data):
-    """Cadastra novo usuário"""
+@instrument
+def ensure_row_ids(url, worksheet_name, create=True):
+    """
+    Cria a coluna de identificadores (ROW_ID_COLUMN) ao final da aba, se ela
+    ainda não existir (e create=True), com um ID para cada linha de dados.
+    A coluna ocupa a primeira coluna totalmente vazia após os cabeçalhos, sem
+    sobrescrever dados sob cabeçalhos em branco. Cabeçalho e IDs são gravados
+    em um único batch_update (atômico), então uma interrupção não deixa a
+    coluna pela metade.
+    Retorna True se a aba tem (ou passou a ter) a coluna.
+    """
     worksheet = get_worksheet(url, worksheet_name)
     if not worksheet:
-        return False, "Planilha não encontrada"
+        return False
     
     try:
-        # Verifica se o usuário já existe
-        if get_user_by_login(url, worksheet_name, user_data['Login']):
-            return False, "Usuário já existe"
+        headers = get_headers(url, worksheet_name, refresh=True)
+        if not headers:
+            return False
+        if ROW_ID_COLUMN in headers:
+            return True
+        if not create:
+            return False
         
-        # Obtém os cabeçalhos da planilha
-        headers = worksheet.row_values(1)
+        # A aba inteira, por colunas: row_values(1) omite cabeçalhos em branco no
+        # fim da linha, mas as colunas deles podem ter dados
+        col_count = getattr(worksheet, 'col_count', None) or len(headers)
+        columns = schedule(
+            'read', worksheet.batch_get, [f"A1:{_column_letter(col_count)}"],
+            major_dimension='COLUMNS'
+        )[0]
+        columns = [list(values) for values in columns]
+        used = [any(str(value).strip() for value in values) for values in columns]
+        # Primeira coluna sem cabeçalho nem dados após os cabeçalhos
+        col = len(headers) + 1
+        while col <= len(columns) and used[col - 1]:
+            col += 1
+        # Número de linhas de dados: o da coluna preenchida mais longa
+        size = max((len(values) - 1 for values in columns), default=0)
+        if col > col_count:
+            schedule('write', worksheet.add_cols, col - col_count)
         
-        # Prepara os dados de acordo com os cabeçalhos
-        row_data = []
-        for header in headers:
-            row_data.append(user_data.get(header, ''))
+        letter = _column_letter(col)
+        updates = [{'range': f"{letter}1", 'values': [[ROW_ID_COLUMN]]}]
+        if size:
+            updates.append({
+                'range': f"{letter}2:{letter}{size + 1}",
+                'values': [[new_row_id()] for _ in range(size)]
+            })
+        schedule('write', worksheet.batch_update, updates, value_input_option='RAW')
+        get_headers(url, worksheet_name, refresh=True)
+        invalidate_user_index(url, worksheet_name)
+        return True
+    except Exception as e:
+        st.error(f"Erro ao criar a coluna {ROW_ID_COLUMN}: {str(e)}")
+        return False
+
+@instrument
+def locate_row(url, worksheet_name, expected_row, row_id=None, expected_values=None):
+    """
+    Confere e, se preciso, localiza o número atual de uma linha na planilha
+    sem baixar a aba inteira.
+    
+    Com a coluna de identificador (ROW_ID_COLUMN), lê uma única célula da linha
+    esperada e, se não bater, apenas a coluna de identificadores. Sem ela,
+    lê a linha esperada e compara com expected_values.
+    Retorna o número da linha ou None se o registro não for encontrado (ou a
+    leitura falhar).
+    """
+    headers = get_headers(url, worksheet_name)
+    if not headers:
+        return None
+    
+    try:
+        return _locate_row(url, worksheet_name, headers, expected_row, row_id, expected_values)
+    except Exception as e:
+        st.error(f"Erro ao localizar linha: {str(e)}")
+        return None
+
+@instrument
+def read_sheet_to_dataframe(url, worksheet_name, user_email=None, schema=None, columns=None):
+    """
+    Lê uma planilha e retorna um DataFrame, opcionalmente filtrado por e-mail.
+    Se um schema for informado (ver utils/schema.py), as colunas são tipadas na carga;
+    com `columns`, apenas essas colunas são baixadas.
+    """
+    try:
+        # Obter os registros (do espelho local se a planilha não mudou)
+        records = fetch_records(url, worksheet_name, columns)
+        if records is None:
+            return None
+        df = pd.DataFrame(records).fillna('')
+        if schema:
+            df = apply_schema(df, schema)
         
-        # Adiciona o novo usuário
-        worksheet.append_row(row_data)
-        return True, "Usuário cadastrado com sucesso"
+        # Filtrar pelo e-mail se fornecido
+        if user_email and 'E-mail' in df.columns:
+            df = df[df['E-mail'].str.lower() == user_email.lower()]
+        
+        return df
+    except Exception as e:
+        st.error(f"Erro ao processar dados: {str(e)}")
+        return pd.DataFrame()
+
+def _lookup_key(value):
+    """Normaliza o valor buscado (sem diferenciar maiúsculas/minúsculas)"""
+    return str(value).casefold()
+
+def _build_lookup_index(url, worksheet_name, column):
+    """Baixa a aba e monta o índice valor da coluna -> registro"""
+    worksheet = get_worksheet(url, worksheet_name)
+    if not worksheet:
+        return None
+    records_by_key = {}
+    records = schedule('read', worksheet.get_all_records, key=('records', url, worksheet_name))
+    for record in records:
+        if record and column in record:
+            # Mantém o primeiro registro em caso de valores repetidos
+            records_by_key.setdefault(_lookup_key(record.get(column, '')), record)
+    entry = {'built_at': time.time(), 'records': records_by_key}
+    with _client_lock:
+        _lookup_indexes[(url, worksheet_name, column)] = entry
+    return entry
+
+def _patch_lookup_indexes(url, worksheet_name, record):
+    """Inclui um registro recém-adicionado nos índices da aba, sem baixá-la de novo"""
+    with _client_lock:
+        for (index_url, index_ws, column), entry in _lookup_indexes.items():
+            if (index_url, index_ws) == (url, worksheet_name) and column in record:
+                entry['records'].setdefault(_lookup_key(record[column]), dict(record))
+
+@instrument
+def refresh_lookup_index(url, worksheet_name, column):
+    """Reconstrói o índice de busca de uma coluna (usado pela atualização em segundo plano)"""
+    try:
+        return _build_lookup_index(url, worksheet_name, column) is not None
+    except Exception:
+        return False
+
+@instrument
+def invalidate_user_index(url=None, worksheet_name=None):
+    """Descarta os índices de busca (de uma aba ou de todas)"""
+    with _client_lock:
+        for key in list(_lookup_indexes):
+            if url is None or key[:2] == (url, worksheet_name):
+                del _lookup_indexes[key]
+
+@instrument
+def find_record(url, worksheet_name, column, value):
+    """
+    Busca o primeiro registro cujo valor na coluna é igual a value (sem
+    diferenciar maiúsculas/minúsculas), por um índice mantido em memória
+    """
+    try:
+        with _client_lock:
+            entry = _lookup_indexes.get((url, worksheet_name, column))
+        if entry is None or time.time() - entry['built_at'] > USER_INDEX_TTL:
+            incr('cache_events_total', cache='lookup', result='miss')
+            entry = _build_lookup_index(url, worksheet_name, column)
+        else:
+            incr('cache_events_total', cache='lookup', result='hit')
+        if entry is None:
+            return None
+
+        record = entry['records'].get(_lookup_key(value))
+        # Valor desconhecido: o registro pode ter sido criado fora do app
+        if record is None and time.time() - entry['built_at'] > USER_INDEX_MISS_REFRESH:
+            entry = _build_lookup_index(url, worksheet_name, column)
+            record = entry['records'].get(_lookup_key(value)) if entry else None
+        return dict(record) if record else None
     except Exception as e:
-        return False, f"Erro ao cadastrar usuário: {str(e)}"
+        st.error(f"Erro ao buscar registro: {str(e)}")
+    return None
+
+@instrument
+def get_user_by_login(url, worksheet_name, login):
+    """Busca usuário pelo login"""
+    return find_record(url, worksheet_name, LOGIN_COLUMN, login)
 
+@instrument
 def update_row_in_sheet(url, worksheet_name, row_num, updated_values):
     """
     Atualiza ou adiciona uma linha específica
@@ -94,56 +555,200 @@ def update_row_in_sheet(url, worksheet_name, row_num, updated_values):
         row_num: Número da linha a atualizar (2+ para linhas existentes, -1 para adicionar nova)
         updated_values: Dicionário com valores a atualizar ou dict/list para nova linha
     """
+    if row_num != -1:
+        # Atualizar linha existente (apenas as células informadas, em uma requisição)
+        return update_rows_in_sheet(url, worksheet_name, {row_num: updated_values})
+
     worksheet = get_worksheet(url, worksheet_name)
     if not worksheet:
         return False
     
     try:
-        # Obtém os cabeçalhos da planilha
-        headers = worksheet.row_values(1)
+        # Adicionar nova linha
+        row_data = []
         
-        if row_num == -1:
-            # Adicionar nova linha
-            row_data = []
-            
-            # Se os dados são um dicionário, organizamos pelos cabeçalhos
-            if isinstance(updated_values, dict):
-                for header in headers:
-                    row_data.append(updated_values.get(header, ''))
-            # Se é uma lista, usamos diretamente
-            elif isinstance(updated_values, list):
-                row_data = updated_values
-            
-            worksheet.append_row(row_data)
-            return True
-        else:
-            # Atualizar linha existente
-            if isinstance(updated_values, dict):
-                # Para cada cabeçalho, atualiza o valor correspondente
-                for i, header in enumerate(headers, start=1):
-                    if header in updated_values:
-                        worksheet.update_cell(row_num, i, updated_values[header])
-            elif isinstance(updated_values, list):
-                # Atualiza cada coluna com os valores da lista
-                for i, value in enumerate(updated_values, start=1):
-                    worksheet.update_cell(row_num, i, value)
-            
-            return True
+        # Se os dados são um dicionário, organizamos pelos cabeçalhos
+        if isinstance(updated_values, dict):
+            # Ordem atual das colunas (podem ter sido inseridas ou movidas)
+            headers = get_headers(url, worksheet_name, refresh=True)
+            # Novas linhas recebem um identificador estável
+            if ROW_ID_COLUMN in headers and not updated_values.get(ROW_ID_COLUMN):
+                updated_values = {**updated_values, ROW_ID_COLUMN: new_row_id()}
+            for header in headers:
+                row_data.append(updated_values.get(header, ''))
+        # Se é uma lista, usamos diretamente
+        elif isinstance(updated_values, list):
+            row_data = updated_values
+        
+        schedule('write', worksheet.append_row, row_data)
+        _patch_lookup_indexes(url, worksheet_name, dict(zip(get_headers(url, worksheet_name), row_data)))
+        return True
     except Exception as e:
         st.error(f"Erro ao atualizar/adicionar linha: {str(e)}")
         return False
 
+@instrument
+def append_rows_in_sheet(url, worksheet_name, rows, chunk_size=500, start=0, on_chunk=None):
+    """
+    Adiciona várias linhas ao final da aba em lotes (uma requisição append_rows por lote)
+    
+    Args:
+        url: URL da planilha
+        worksheet_name: Nome da aba
+        rows: Lista de linhas (listas já na ordem dos cabeçalhos)
+        chunk_size: Quantidade de linhas por requisição
+        start: Posição inicial em rows (para retomar uma importação)
+        on_chunk: Função chamada com o total de linhas já gravadas após cada lote
+    
+    Returns:
+        Total de linhas de rows já gravadas (igual a len(rows) em caso de sucesso)
+    """
+    worksheet = get_worksheet(url, worksheet_name)
+    if not worksheet:
+        return start
+    
+    done = start
+    try:
+        while done < len(rows):
+            chunk = rows[done:done + chunk_size]
+            # RAW: o conteúdo importado é gravado como texto, nunca avaliado como fórmula
+            schedule('write', worksheet.append_rows, chunk, value_input_option='RAW')
+            done += len(chunk)
+            if on_chunk:
+                on_chunk(done)
+    except Exception as e:
+        st.error(f"Erro ao adicionar linhas (gravadas {done} de {len(rows)}): {str(e)}")
+    return done
+
+@instrument
+def update_rows_in_sheet(url, worksheet_name, updates):
+    """
+    Atualiza várias linhas em uma única requisição (batch_update)
+    
+    Args:
+        url: URL da planilha
+        worksheet_name: Nome da aba
+        updates: Dicionário {número da linha: valores}, onde valores é um dict
+                 (cabeçalho -> valor) ou uma lista a partir da coluna A
+    """
+    worksheet = get_worksheet(url, worksheet_name)
+    if not worksheet:
+        return False
+    
+    try:
+        # Os intervalos dependem da posição das colunas: confere a ordem atual
+        # antes de gravar, para não escrever em outra coluna
+        if any(isinstance(values, dict) for values in updates.values()):
+            headers = get_headers(url, worksheet_name, refresh=True)
+        else:
+            headers = get_headers(url, worksheet_name)
+        data = []
+        for row_num, values in updates.items():
+            data.extend(_row_update_ranges(headers, row_num, values))
+        
+        if data:
+            schedule('write', worksheet.batch_update, data, value_input_option='USER_ENTERED')
+            # Os registros dos índices de busca podem ter mudado
+            invalidate_user_index(url, worksheet_name)
+        return True
+    except Exception as e:
+        st.error(f"Erro ao atualizar linhas: {str(e)}")
+        return False
+
+@instrument
 def delete_row_in_sheet(url, worksheet_name, row_num):
     """Remove uma linha específica"""
     worksheet = get_worksheet(url, worksheet_name)
     if worksheet:
         try:
-            worksheet.delete_rows(row_num)
+            schedule('write', worksheet.delete_rows, row_num)
+            invalidate_user_index(url, worksheet_name)
             return True
         except Exception as e:
             st.error(f"Erro ao excluir linha: {str(e)}")
     return False
 
+def _row_ranges(row_nums):
+    """
+    Agrupa números de linha em intervalos contíguos [início, fim],
+    do último para o primeiro (excluir de baixo para cima mantém os
+    números das linhas acima válidos)
+    """
+    ranges = []
+    for row_num in sorted(set(row_nums), reverse=True):
+        if ranges and ranges[-1][0] == row_num + 1:
+            ranges[-1][0] = row_num
+        else:
+            ranges.append([row_num, row_num])
+    return ranges
+
+@instrument
+def delete_rows_in_sheet(url, worksheet_name, row_nums):
+    """
+    Remove várias linhas em uma única requisição (batch_update com um
+    deleteDimension por intervalo de linhas vizinhas)
+    """
+    sheet = get_google_sheet_by_url(url)
+    worksheet = get_worksheet(url, worksheet_name)
+    if not sheet or not worksheet:
+        return False
+    
+    ranges = _row_ranges(row_nums)
+    if not ranges:
+        return True
+    try:
+        requests = [
+            {
+                'deleteDimension': {
+                    'range': {
+                        'sheetId': worksheet.id,
+                        'dimension': 'ROWS',
+                        'startIndex': start - 1,
+                        'endIndex': end
+                    }
+                }
+            }
+            for start, end in ranges
+        ]
+        schedule('write', sheet.batch_update, {'requests': requests})
+        invalidate_user_index(url, worksheet_name)
+        return True
+    except Exception as e:
+        st.error(f"Erro ao excluir linhas: {str(e)}")
+        return False
+
+@instrument
+def locate_rows(url, worksheet_name, targets):
+    """
+    Localiza várias linhas de uma vez. targets é uma lista de
+    (linha esperada, ID, valores esperados); retorna a lista de números de
+    linha (None para registros não encontrados), ou None se a leitura falhar.
+    
+    Com a coluna de identificador, lê apenas essa coluna (uma requisição);
+    sem ela, confere cada linha com locate_row.
+    """
+    # Falhas de leitura retornam None para a chamada inteira: quem grava
+    # (ex.: o diário) tenta de novo em vez de tratar o registro como removido
+    try:
+        headers = get_headers(url, worksheet_name)
+        if not headers:
+            return None
+        if ROW_ID_COLUMN not in headers or not all(row_id for _, row_id, _ in targets):
+            return [_locate_row(url, worksheet_name, headers, *target) for target in targets]
+        
+        worksheet = get_worksheet(url, worksheet_name)
+        if not worksheet:
+            return None
+        ids = _read_id_column(worksheet, url, worksheet_name, headers)
+        positions = {}
+        for row_num, value in enumerate(ids[1:], start=2):
+            positions.setdefault(str(value), row_num)
+        return [positions.get(str(row_id)) for _, row_id, _ in targets]
+    except Exception as e:
+        st.error(f"Erro ao localizar linhas: {str(e)}")
+        return None
+
+@instrument
 def apply_filters(df, filters):
     """Aplica múltiplos filtros ao DataFrame"""
     try:
@@ -159,6 +764,7 @@ def apply_filters(df, filters):
         st.error(f"Erro ao aplicar filtros: {str(e)}")
         return df
 
+@instrument
 def validate_dataframe(df):
     """Verifica se o DataFrame é válido para filtragem"""
     if df is None:
@@ -0,0 +1,428 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from utils.google_sheets import ROW_ID_COLUMN
+from utils.metrics import incr, instrument, observe
+from utils.storage import StorageBackend
+
+# Arquivo do diário de escritas (sobrevive a reinícios do processo)
+JOURNAL_PATH = os.environ.get('SHEETS_JOURNAL_PATH', os.path.join('.cache', 'journal.sqlite3'))
+# Espera (segundos) após uma escrita para agrupar as seguintes no mesmo envio
+JOURNAL_LINGER = 0.5
+# Intervalo máximo (segundos) entre verificações do diário
+JOURNAL_POLL_INTERVAL = 5.0
+# Entradas enviadas por rodada
+JOURNAL_BATCH_SIZE = 500
+# Espera (segundos) entre novas tentativas de uma entrada: base * 2^tentativas, até o máximo
+JOURNAL_RETRY_BASE = 2.0
+JOURNAL_RETRY_MAX = 300.0
+# Tempo (segundos) após o qual entradas em envio por um processo que parou voltam a ficar pendentes
+JOURNAL_CLAIM_TIMEOUT = 600.0
+
+logger = logging.getLogger(__name__)
+
+class JournaledBackend(StorageBackend):
+    """
+    Envolve um backend (o Google Sheets): adições, edições e exclusões de
+    registros são gravadas primeiro em um diário SQLite local e confirmadas
+    na hora; uma thread em segundo plano envia as entradas pendentes em
+    lotes (um append_rows, um batch_update ou um deleteDimension em lote por
+    grupo de entradas consecutivas) e repete as falhas até a confirmação.
+
+    Os registros são localizados na planilha (pelo ID) só no envio, então
+    escritas anteriores que deslocam linhas não afetam as seguintes. As
+    leituras, as escritas por número de linha e as tabelas fora de `tables`
+    (ex.: o cadastro de usuários, que precisa valer no login seguinte) vão
+    direto ao backend.
+    """
+
+    name = 'journal'
+
+    def __init__(self, inner, path=None, tables=None):
+        self.inner = inner
+        self.path = path or JOURNAL_PATH
+        self.tables = set(tables) if tables is not None else None
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._worker = None
+        self._on_flush = None
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # A confirmação ao usuário só acontece depois da gravação em disco
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, tbl TEXT NOT NULL, op TEXT NOT NULL, "
+            "payload TEXT NOT NULL, created_at REAL NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "next_attempt_at REAL NOT NULL DEFAULT 0, status TEXT NOT NULL DEFAULT 'pending', "
+            "last_error TEXT)"
+        )
+        return conn
+
+    def _journaled(self, table):
+        return self.tables is None or table in self.tables
+
+    def _enqueue(self, table, op, payloads):
+        """Grava as entradas no diário e acorda o envio em segundo plano"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO entries (tbl, op, payload, created_at) VALUES (?, ?, ?, ?)",
+                    [(table, op, json.dumps(payload, ensure_ascii=False, default=str), now)
+                     for payload in payloads]
+                )
+        finally:
+            conn.close()
+        incr('journal_entries_total', value=len(payloads), op=op)
+        self._wake.set()
+
+    # Leituras e escritas por número de linha: direto no backend
+    def headers(self, table, refresh=False):
+        return self.inner.headers(table, refresh=refresh)
+
+    def read(self, table, schema=None, columns=None):
+        return self.inner.read(table, schema=schema, columns=columns)
+
+    def fetch_row(self, table, row_num):
+        return self.inner.fetch_row(table, row_num)
+
+    def lookup(self, table, column, value):
+        return self.inner.lookup(table, column, value)
+
+    def refresh_lookup(self, table, column):
+        return self.inner.refresh_lookup(table, column)
+
+    def ensure_row_ids(self, table, create=True):
+        return self.inner.ensure_row_ids(table, create=create)
+
+    def locate(self, table, expected_row, row_id=None, expected_values=None):
+        return self.inner.locate(table, expected_row, row_id, expected_values)
+
+    def locate_many(self, table, targets):
+        return self.inner.locate_many(table, targets)
+
+    def append_rows(self, table, rows, chunk_size=500, start=0, on_chunk=None):
+        # A importação em lote tem seus próprios pontos de retomada
+        return self.inner.append_rows(table, rows, chunk_size, start, on_chunk)
+
+    def update(self, table, updates):
+        return self.inner.update(table, updates)
+
+    def delete_many(self, table, row_nums):
+        return self.inner.delete_many(table, row_nums)
+
+    def sync(self, table):
+        return self.inner.sync(table)
+
+    # Escritas de registros: pelo diário
+    @instrument
+    def append(self, table, values):
+        if not self._journaled(table):
+            return self.inner.append(table, values)
+        if isinstance(values, dict):
+            # O registro é gravado como veio e só é convertido para a ordem dos
+            # cabeçalhos no envio (eles podem estar indisponíveis agora). O ID é
+            # gerado já, para que um reenvio não duplique o registro.
+            if not values.get(ROW_ID_COLUMN):
+                values = {**values, ROW_ID_COLUMN: self.new_row_id()}
+            self._enqueue(table, 'append', [{'record': values}])
+        else:
+            self._enqueue(table, 'append', [{'values': list(values)}])
+        return True
+
+    @instrument
+    def update_record(self, table, target, values):
+        if not self._journaled(table):
+            return super().update_record(table, target, values)
+        self._enqueue(table, 'update', [{'target': list(target), 'values': values}])
+        return target[0]
+
+    @instrument
+    def delete_records(self, table, targets):
+        if not self._journaled(table):
+            return super().delete_records(table, targets)
+        self._enqueue(table, 'delete', [{'target': list(target)} for target in targets])
+        return [target[0] for target in targets]
+
+    # Envio em segundo plano
+    def start(self, on_flush=None):
+        """
+        Inicia (uma vez) a thread de envio. on_flush(tabelas) é chamada após
+        cada rodada que gravou algo na planilha ou encerrou entradas com conflito.
+        """
+        if on_flush is not None:
+            self._on_flush = on_flush
+        with self._flush_lock:
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(target=self._run, name='journal-flush', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            # Entradas de execuções anteriores do processo também são enviadas
+            self._wake.wait(JOURNAL_POLL_INTERVAL)
+            if self._wake.is_set():
+                time.sleep(JOURNAL_LINGER)
+                self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                incr('journal_flushes_total', result='erro')
+                logger.exception("Erro ao enviar o diário de escritas: %s", e)
+
+    def _claim(self):
+        """
+        Reserva (status 'sending') as próximas entradas pendentes, em uma
+        transação exclusiva: outro envio sobre o mesmo arquivo (ex.: uma
+        instância anterior do backend, ainda ativa) não pega as mesmas
+        entradas, nem entradas posteriores às que estão em envio.
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Reservas de um envio interrompido voltam para a fila (com tentativa
+                # contada, para que as adições sejam conferidas antes do reenvio)
+                conn.execute(
+                    "UPDATE entries SET status = 'pending', attempts = attempts + 1, next_attempt_at = 0 "
+                    "WHERE status = 'sending' AND next_attempt_at <= ?",
+                    (now,)
+                )
+                if conn.execute("SELECT 1 FROM entries WHERE status = 'sending' LIMIT 1").fetchone():
+                    conn.execute("COMMIT")
+                    return []
+                rows = conn.execute(
+                    "SELECT seq, tbl, op, payload, attempts, created_at, next_attempt_at FROM entries "
+                    "WHERE status = 'pending' ORDER BY seq LIMIT ?",
+                    (JOURNAL_BATCH_SIZE,)
+                ).fetchall()
+                # Entradas em espera (nova tentativa agendada) seguram as posteriores
+                due = []
+                for row in rows:
+                    if row[6] > now:
+                        break
+                    due.append(row)
+                conn.executemany(
+                    "UPDATE entries SET status = 'sending', next_attempt_at = ? WHERE seq = ?",
+                    [(now + JOURNAL_CLAIM_TIMEOUT, row[0]) for row in due]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        return [
+            {'seq': seq, 'table': table, 'op': op, 'payload': json.loads(payload), 'attempts': attempts,
+             'created_at': created_at, 'next_attempt_at': next_attempt_at}
+            for seq, table, op, payload, attempts, created_at, next_attempt_at in due
+        ]
+
+    def _release(self, entries):
+        """Devolve à fila, sem contar tentativa, entradas reservadas e não enviadas"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "UPDATE entries SET status = 'pending', next_attempt_at = ? "
+                    "WHERE seq = ? AND status = 'sending'",
+                    [(entry['next_attempt_at'], entry['seq']) for entry in entries]
+                )
+        finally:
+            conn.close()
+
+    @instrument
+    def flush(self):
+        """
+        Envia as entradas pendentes, em ordem, agrupando as consecutivas de
+        mesma tabela e operação. Retorna o número de entradas confirmadas.
+        """
+        with self._flush_lock:
+            claimed = self._claim()
+            groups = []
+            for entry in claimed:
+                if groups and groups[-1][:2] == (entry['table'], entry['op']):
+                    groups[-1][2].append(entry)
+                else:
+                    groups.append((entry['table'], entry['op'], [entry]))
+
+            confirmed = 0
+            touched = set()
+            settled = 0
+            try:
+                for table, op, entries in groups:
+                    try:
+                        done, failed, error = self._apply(table, op, entries)
+                    except Exception as e:
+                        done, failed, error = [], [], str(e) or type(e).__name__
+                    self._settle(entries, done, failed, error)
+                    settled += len(entries)
+                    confirmed += len(done)
+                    if done or failed:
+                        touched.add(table)
+                    if len(done) + len(failed) < len(entries):
+                        break
+            finally:
+                self._release(claimed[settled:])
+
+        if touched and self._on_flush:
+            self._on_flush(touched)
+        return confirmed
+
+    def _apply(self, table, op, entries):
+        """
+        Envia um grupo de entradas. Retorna (confirmadas, com conflito, erro);
+        as demais ficam pendentes para uma nova tentativa, com o erro registrado.
+        """
+        if op == 'append':
+            pending = entries
+            headers = self.inner.headers(table, refresh=True)
+            if not headers:
+                # Sem os cabeçalhos não há como montar as linhas: tenta de novo depois
+                return [], [], "Cabeçalhos da planilha indisponíveis"
+            rows = {entry['seq']: self._row(headers, entry['payload']) for entry in entries}
+            if ROW_ID_COLUMN in headers and any(entry['attempts'] for entry in entries):
+                # Um envio anterior pode ter sido gravado apesar do erro: não duplica
+                col = headers.index(ROW_ID_COLUMN)
+                found = self.inner.locate_many(table, [
+                    (None, rows[entry['seq']][col] if col < len(rows[entry['seq']]) else '', None)
+                    for entry in entries
+                ])
+                if found is None:
+                    return [], [], "Falha ao conferir registros já enviados"
+                pending = [entry for entry, row in zip(entries, found) if row is None]
+            rows = [rows[entry['seq']] for entry in pending]
+            written = self.inner.append_rows(table, rows) if rows else 0
+            skipped = [entry for entry in entries if entry not in pending]
+            return skipped + pending[:written], [], "Falha ao adicionar linhas na planilha"
+
+        targets = [tuple(entry['payload']['target']) for entry in entries]
+        located = self.inner.locate_many(table, targets)
+        if located is None:
+            # Leitura falhou: "não encontrado" só vale com a planilha lida por inteiro
+            return [], [], "Falha ao localizar registros na planilha"
+        if op == 'update':
+            found = [(entry, row) for entry, row in zip(entries, located) if row is not None]
+            missing = [entry for entry, row in zip(entries, located) if row is None]
+            updates = {}
+            for entry, row in found:
+                # Várias edições da mesma linha viram uma só, na ordem do diário
+                updates.setdefault(row, {}).update(entry['payload']['values'])
+            if updates and not self.inner.update(table, updates):
+                return [], [], "Falha ao atualizar linhas na planilha"
+            # Registro alterado ou removido na planilha: a edição não tem onde ser aplicada
+            return [entry for entry, _ in found], missing, None
+
+        if op == 'delete':
+            rows = sorted({row for row in located if row is not None})
+            if rows and not self.inner.delete_many(table, rows):
+                return [], [], "Falha ao remover linhas da planilha"
+            # Registros não encontrados já foram removidos (por exemplo, por um envio anterior)
+            return entries, [], None
+
+        return [], entries, None
+
+    @staticmethod
+    def _row(headers, payload):
+        """Linha a enviar (na ordem dos cabeçalhos atuais) de uma entrada de adição"""
+        if 'record' in payload:
+            return [payload['record'].get(header, '') for header in headers]
+        return payload['values']
+
+    def _settle(self, entries, done, failed, error=None):
+        """Remove as entradas confirmadas e reagenda as que falharam, com o erro"""
+        now = time.time()
+        done_seqs = {entry['seq'] for entry in done}
+        failed_seqs = {entry['seq'] for entry in failed}
+        retry = [entry for entry in entries if entry['seq'] not in done_seqs | failed_seqs]
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("DELETE FROM entries WHERE seq = ?", [(seq,) for seq in done_seqs])
+                conn.executemany(
+                    "UPDATE entries SET status = 'failed', last_error = ? WHERE seq = ?",
+                    [("Registro não encontrado na planilha", seq) for seq in failed_seqs]
+                )
+                conn.executemany(
+                    "UPDATE entries SET status = 'pending', attempts = attempts + 1, next_attempt_at = ?, "
+                    "last_error = ? WHERE seq = ?",
+                    [
+                        (now + min(JOURNAL_RETRY_MAX, JOURNAL_RETRY_BASE * 2 ** entry['attempts']),
+                         error or "Falha ao gravar na planilha", entry['seq'])
+                        for entry in retry
+                    ]
+                )
+        finally:
+            conn.close()
+        for entry in done:
+            observe('journal_lag_seconds', now - entry['created_at'])
+        if done:
+            incr('journal_flushes_total', value=len(done), result='confirmada')
+        if failed:
+            incr('journal_flushes_total', value=len(failed), result='conflito')
+        if retry:
+            incr('journal_flushes_total', value=len(retry), result='nova_tentativa')
+
+    def pending_writes(self, table):
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT COUNT(*) FROM entries WHERE tbl = ? AND status IN ('pending', 'sending')", (table,)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def journal_status(self):
+        """
+        Pendentes, com conflito, idade (segundos) da entrada pendente mais
+        antiga e o erro da última tentativa que falhou entre as pendentes
+        """
+        conn = self._connect()
+        try:
+            pending, oldest = conn.execute(
+                "SELECT COUNT(*), MIN(created_at) FROM entries WHERE status IN ('pending', 'sending')"
+            ).fetchone()
+            last_error = conn.execute(
+                "SELECT last_error FROM entries WHERE status IN ('pending', 'sending') "
+                "AND last_error IS NOT NULL ORDER BY seq LIMIT 1"
+            ).fetchone()
+            failed = conn.execute(
+                "SELECT seq, tbl, op, payload, created_at, last_error FROM entries "
+                "WHERE status = 'failed' ORDER BY seq"
+            ).fetchall()
+        finally:
+            conn.close()
+        return {
+            'pending': pending,
+            'oldest_age': time.time() - oldest if oldest else 0.0,
+            'last_error': last_error[0] if last_error else None,
+            'failed': [
+                {'seq': seq, 'tabela': table, 'operação': op, 'dados': payload,
+                 'criada em': time.strftime('%d/%m/%Y %H:%M:%S', time.localtime(created_at)),
+                 'erro': error}
+                for seq, table, op, payload, created_at, error in failed
+            ]
+        }
+
+    def discard_failed(self):
+        """Descarta as entradas com conflito (depois de revisadas)"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM entries WHERE status = 'failed'")
+        finally:
+            conn.close()
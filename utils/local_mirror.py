@@ -0,0 +1,155 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Arquivo SQLite com a cópia local das abas e os pontos de retomada das
+# importações (sobrevive a reinícios do processo)
+MIRROR_PATH = os.environ.get(
+    'SHEETS_MIRROR_PATH',
+    os.path.join('.cache', 'sheets_mirror.sqlite3')
+)
+
+_mirror_lock = threading.Lock()
+
+def _connect():
+    """Abre o banco do espelho, criando a tabela se necessário"""
+    directory = os.path.dirname(MIRROR_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(MIRROR_PATH, timeout=10)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS mirror (
+            url TEXT NOT NULL,
+            worksheet TEXT NOT NULL,
+            version TEXT,
+            fetched_at REAL NOT NULL,
+            records TEXT NOT NULL,
+            PRIMARY KEY (url, worksheet)
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS checkpoints (
+            key TEXT PRIMARY KEY,
+            done INTEGER NOT NULL,
+            total INTEGER NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """
+    )
+    return conn
+
+def load_mirror(url, worksheet_name):
+    """
+    Lê a cópia local de uma aba.
+    Retorna (registros, versão) ou (None, None) se não houver cópia.
+    """
+    # O espelho é apenas um cache: qualquer falha cai no download normal
+    try:
+        with _mirror_lock:
+            conn = _connect()
+            try:
+                row = conn.execute(
+                    "SELECT records, version FROM mirror WHERE url = ? AND worksheet = ?",
+                    (url, worksheet_name)
+                ).fetchone()
+            finally:
+                conn.close()
+    except (sqlite3.Error, OSError):
+        return None, None
+
+    if row is None:
+        return None, None
+    return json.loads(row[0]), row[1]
+
+def save_mirror(url, worksheet_name, records, version):
+    """Grava (ou substitui) a cópia local de uma aba"""
+    try:
+        payload = json.dumps(records, ensure_ascii=False, default=str)
+        with _mirror_lock:
+            conn = _connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO mirror (url, worksheet, version, fetched_at, records) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (url, worksheet_name, version, time.time(), payload)
+                    )
+            finally:
+                conn.close()
+        return True
+    except (sqlite3.Error, OSError, TypeError):
+        return False
+
+def clear_mirror(url=None, worksheet_name=None):
+    """Remove a cópia local (de uma aba, de uma planilha ou de tudo)"""
+    try:
+        with _mirror_lock:
+            conn = _connect()
+            try:
+                with conn:
+                    if url is None:
+                        conn.execute("DELETE FROM mirror")
+                    elif worksheet_name is None:
+                        conn.execute("DELETE FROM mirror WHERE url = ?", (url,))
+                    else:
+                        conn.execute(
+                            "DELETE FROM mirror WHERE url = ? AND worksheet = ?",
+                            (url, worksheet_name)
+                        )
+            finally:
+                conn.close()
+        return True
+    except (sqlite3.Error, OSError):
+        return False
+
+def load_checkpoint(key):
+    """Retorna (linhas já gravadas, total) de uma importação, ou (0, None)"""
+    try:
+        with _mirror_lock:
+            conn = _connect()
+            try:
+                row = conn.execute(
+                    "SELECT done, total FROM checkpoints WHERE key = ?", (key,)
+                ).fetchone()
+            finally:
+                conn.close()
+    except (sqlite3.Error, OSError):
+        return 0, None
+    return (row[0], row[1]) if row else (0, None)
+
+def save_checkpoint(key, done, total):
+    """Registra o progresso de uma importação"""
+    try:
+        with _mirror_lock:
+            conn = _connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO checkpoints (key, done, total, updated_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (key, done, total, time.time())
+                    )
+            finally:
+                conn.close()
+        return True
+    except (sqlite3.Error, OSError):
+        return False
+
+def clear_checkpoint(key):
+    """Remove o ponto de retomada de uma importação concluída"""
+    try:
+        with _mirror_lock:
+            conn = _connect()
+            try:
+                with conn:
+                    conn.execute("DELETE FROM checkpoints WHERE key = ?", (key,))
+            finally:
+                conn.close()
+        return True
+    except (sqlite3.Error, OSError):
+        return False
@@ -0,0 +1,122 @@
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Limites (segundos) dos baldes dos histogramas de latência
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Métricas do processo, chaveadas por (nome, rótulos)
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+
+def _key(name, labels):
+    # Rótulos sempre como texto: valores de tipos diferentes (ex.: status 429 e
+    # 'erro') não podem ser comparados na ordenação do snapshot
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+def incr(name, value=1, **labels):
+    """Incrementa um contador (ex.: requisições, acertos de cache)"""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def observe(name, seconds, **labels):
+    """Registra uma medição de latência no histograma"""
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = {'buckets': [0] * len(LATENCY_BUCKETS), 'count': 0, 'sum': 0.0}
+            _histograms[key] = hist
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                hist['buckets'][i] += 1
+        hist['count'] += 1
+        hist['sum'] += seconds
+
+@contextmanager
+def timed(name, **labels):
+    """Mede a duração do bloco e registra no histograma `name`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+def instrument(func):
+    """Decorador: registra latência e número de chamadas da função"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with timed('function_seconds', function=func.__qualname__):
+            return func(*args, **kwargs)
+    return wrapper
+
+def process_uptime():
+    """Segundos desde o início do processo (via /proc, no Linux), ou None"""
+    try:
+        with open('/proc/self/stat') as f:
+            # Campo 22 (starttime), contado depois do nome do processo entre parênteses
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+def _quantile(hist, q):
+    """Estimativa do quantil a partir dos baldes do histograma"""
+    if not hist['count']:
+        return 0.0
+    target = q * hist['count']
+    for bound, count in zip(LATENCY_BUCKETS, hist['buckets']):
+        if count >= target:
+            return bound
+    return float('inf')
+
+def snapshot():
+    """Retorna cópias dos contadores e um resumo dos histogramas"""
+    with _lock:
+        counters = [
+            {'métrica': name, **dict(labels), 'valor': value}
+            for (name, labels), value in sorted(_counters.items())
+        ]
+        histograms = [
+            {
+                'métrica': name, **dict(labels),
+                'chamadas': hist['count'],
+                'média (ms)': round(1000 * hist['sum'] / hist['count'], 1) if hist['count'] else 0.0,
+                'p50 (ms)': 1000 * _quantile(hist, 0.5),
+                'p95 (ms)': 1000 * _quantile(hist, 0.95),
+            }
+            for (name, labels), hist in sorted(_histograms.items())
+        ]
+    return counters, histograms
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+def export_text():
+    """Exporta as métricas no formato texto do Prometheus"""
+    lines = []
+    with _lock:
+        for (name, labels), value in sorted(_counters.items()):
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), hist in sorted(_histograms.items()):
+            for bound, count in zip(LATENCY_BUCKETS, hist['buckets']):
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {hist['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {hist['sum']:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {hist['count']}")
+    return "\n".join(lines) + "\n"
+
+def reset():
+    """Zera todas as métricas"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
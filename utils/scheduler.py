@@ -0,0 +1,142 @@
+import random
+import threading
+import time
+
+import requests
+
+from utils.metrics import incr, observe, timed
+
+# Cotas por minuto do Google Sheets (leitura/escrita), com folga
+READS_PER_MINUTE = 55
+WRITES_PER_MINUTE = 55
+# Tentativas e espera (segundos) do backoff exponencial com jitter
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 32.0
+# Espera máxima (segundos) por uma ficha antes de enviar a requisição mesmo assim
+MAX_QUEUE_WAIT = 60.0
+# Espera máxima (segundos) pelo resultado de uma leitura idêntica em andamento
+# antes de fazer a própria requisição
+COALESCE_WAIT = 90.0
+
+# Erros HTTP que podem ser repetidos. Escritas só são repetidas em 429,
+# pois após um 5xx a escrita pode já ter sido aplicada.
+RETRYABLE_READ_STATUS = {429, 500, 502, 503, 504}
+RETRYABLE_WRITE_STATUS = {429}
+
+_lock = threading.Lock()
+_buckets = {
+    'read': {'rate': READS_PER_MINUTE / 60.0, 'capacity': READS_PER_MINUTE,
+             'tokens': float(READS_PER_MINUTE), 'updated': time.monotonic()},
+    'write': {'rate': WRITES_PER_MINUTE / 60.0, 'capacity': WRITES_PER_MINUTE,
+              'tokens': float(WRITES_PER_MINUTE), 'updated': time.monotonic()},
+}
+_inflight = {}
+
+def configure_quota(reads_per_minute=READS_PER_MINUTE, writes_per_minute=WRITES_PER_MINUTE):
+    """Redefine as cotas por minuto (e enche os baldes)"""
+    with _lock:
+        for kind, per_minute in (('read', reads_per_minute), ('write', writes_per_minute)):
+            _buckets[kind].update(
+                rate=per_minute / 60.0,
+                capacity=per_minute,
+                tokens=float(per_minute),
+                updated=time.monotonic()
+            )
+
+def _acquire(kind):
+    """Aguarda uma ficha do balde de leitura/escrita"""
+    bucket = _buckets[kind]
+    started = time.monotonic()
+    deadline = started + MAX_QUEUE_WAIT
+    while True:
+        with _lock:
+            now = time.monotonic()
+            bucket['tokens'] = min(
+                bucket['capacity'],
+                bucket['tokens'] + (now - bucket['updated']) * bucket['rate']
+            )
+            bucket['updated'] = now
+            if bucket['tokens'] >= 1 or now >= deadline:
+                bucket['tokens'] -= 1
+                observe('sheets_queue_wait_seconds', now - started, kind=kind)
+                return
+            wait = (1 - bucket['tokens']) / bucket['rate']
+        time.sleep(min(wait, max(deadline - now, 0.01)))
+
+def _status_code(error):
+    """Extrai o código HTTP de um erro do gspread/requests, se houver"""
+    response = getattr(error, 'response', None)
+    code = getattr(response, 'status_code', None)
+    if code is None:
+        code = getattr(error, 'code', None)
+    return code if isinstance(code, int) else None
+
+def _is_retryable(kind, error):
+    """Indica se o erro é transitório e a chamada pode ser repetida"""
+    if kind == 'read' and isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    allowed = RETRYABLE_READ_STATUS if kind == 'read' else RETRYABLE_WRITE_STATUS
+    return _status_code(error) in allowed
+
+def _execute(kind, fn, args, kwargs):
+    """Executa a chamada respeitando a cota e repetindo erros transitórios"""
+    method = getattr(fn, '__name__', 'call')
+    attempt = 0
+    while True:
+        _acquire(kind)
+        incr('sheets_requests_total', kind=kind, method=method)
+        try:
+            with timed('sheets_request_seconds', method=method):
+                return fn(*args, **kwargs)
+        except Exception as e:
+            incr('sheets_errors_total', method=method, status=_status_code(e) or 'erro')
+            if attempt >= MAX_RETRIES or not _is_retryable(kind, e):
+                raise
+            incr('sheets_retries_total', method=method)
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+            time.sleep(random.uniform(0, delay))
+            attempt += 1
+
+def schedule(kind, fn, *args, key=None, **kwargs):
+    """
+    Executa uma chamada à API do Sheets pelo agendador central.
+
+    Args:
+        kind: 'read' ou 'write' (define o balde de cota e a política de retry)
+        fn: Função a executar (ex.: worksheet.get_all_records)
+        key: Para leituras, chamadas idênticas em andamento com a mesma chave
+             são unidas em uma única requisição
+    """
+    if kind != 'read' or key is None:
+        return _execute(kind, fn, args, kwargs)
+
+    with _lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = {'done': threading.Event(), 'result': None, 'error': None}
+            _inflight[key] = call
+
+    if not leader:
+        # Outra sessão já está buscando os mesmos dados: aguarda o resultado dela
+        method = getattr(fn, '__name__', 'call')
+        incr('sheets_coalesced_total', method=method)
+        if not call['done'].wait(COALESCE_WAIT):
+            # A chamada em andamento travou: não prende esta sessão junto
+            incr('sheets_coalesce_timeouts_total', method=method)
+            return _execute(kind, fn, args, kwargs)
+        if call['error'] is not None:
+            raise call['error']
+        return call['result']
+
+    try:
+        call['result'] = _execute(kind, fn, args, kwargs)
+        return call['result']
+    except Exception as e:
+        call['error'] = e
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+        call['done'].set()
@@ -0,0 +1,52 @@
+import pandas as pd
+
+# Tipos das colunas da aba Cronograma:
+# 'category' para colunas com poucos valores repetidos (usadas nos filtros),
+# 'date' para datas e 'string' para texto livre
+CRONOGRAMA_SCHEMA = {
+    'Referência': 'category',
+    'Setor': 'category',
+    'Responsável': 'category',
+    'Status': 'category',
+    'Descrição Meta': 'string',
+    'E-mail': 'string',
+    'ID': 'string',
+    'Prazo': 'date',
+    'Data Início': 'date',
+    'Data Fim': 'date',
+    'Data de Conclusão': 'date',
+}
+
+def _as_text(series):
+    """Converte a coluna para texto, sem valores nulos"""
+    return series.astype(str).where(series.notna(), '')
+
+def cast_column(series, kind):
+    """Converte uma coluna para o tipo declarado no schema"""
+    if kind == 'category':
+        return _as_text(series).astype('category')
+    if kind == 'string':
+        return _as_text(series).astype('string')
+    if kind == 'date':
+        text = _as_text(series).str.strip()
+        parsed = pd.to_datetime(text.where(text != ''), errors='coerce', dayfirst=True, format='mixed')
+        # Mantém o texto original se algum valor preenchido não for uma data válida
+        if (parsed.isna() & (text != '')).any():
+            return text.astype('string')
+        return parsed
+    return series
+
+def apply_schema(df, schema, default='string'):
+    """
+    Aplica o schema ao DataFrame em uma única passada na carga dos dados.
+    Colunas de texto fora do schema recebem o tipo `default`.
+    """
+    columns = {}
+    for column in df.columns:
+        kind = schema.get(column)
+        dtype = df[column].dtype
+        if kind is None and (pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)):
+            kind = default
+        if kind is not None:
+            columns[column] = cast_column(df[column], kind)
+    return df.assign(**columns) if columns else df
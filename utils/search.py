@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+# Parâmetros do ranking BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Peso de um termo que casa com a palavra inteira, com o início dela ou com um trecho
+EXACT_WEIGHT = 1.0
+PREFIX_WEIGHT = 0.7
+INFIX_WEIGHT = 0.4
+# Tamanho dos n-gramas usados para achar trechos no meio das palavras
+NGRAM_SIZE = 3
+
+def normalize_text(series):
+    """Converte textos para minúsculas e sem acentos (vetorizado)"""
+    return (
+        series.fillna('').astype(str)
+        .str.normalize('NFKD')
+        .str.replace('[\u0300-\u036f]', '', regex=True)
+        .str.casefold()
+    )
+
+def tokenize(series):
+    """Lista de palavras normalizadas de cada texto"""
+    return normalize_text(series).str.findall(r'\w+')
+
+def _ngrams(word):
+    return {word[i:i + NGRAM_SIZE] for i in range(len(word) - NGRAM_SIZE + 1)}
+
+def build_search_index(series):
+    """
+    Monta o índice invertido de uma coluna de texto.
+    Para cada palavra do vocabulário (ordenado) guarda, em `docs`/`weights`
+    entre bounds[id] e bounds[id + 1], as posições das linhas que a contêm e
+    o peso BM25 da palavra em cada linha. Os n-gramas das palavras permitem
+    encontrar trechos no meio delas.
+    """
+    size = len(series)
+    tokens = tokenize(pd.Series(np.asarray(series, dtype=object), dtype=object))
+    lengths = tokens.str.len().fillna(0).to_numpy(dtype=np.float64)
+    exploded = tokens.explode().dropna()
+
+    doc_ids = np.asarray(exploded.index, dtype=np.int64)
+    codes, vocab = pd.factorize(exploded.to_numpy(dtype=object), sort=True)
+    vocab = np.asarray(vocab, dtype=object)
+
+    # Frequência de cada palavra em cada linha, ordenada por palavra e depois por linha
+    keys, tf = np.unique(codes.astype(np.int64) * max(size, 1) + doc_ids, return_counts=True)
+    word_ids, docs = np.divmod(keys, max(size, 1))
+    bounds = np.searchsorted(word_ids, np.arange(len(vocab) + 1))
+
+    doc_freq = np.diff(bounds)
+    idf = np.log1p((size - doc_freq + 0.5) / (doc_freq + 0.5))
+    average = lengths.mean() if size and lengths.any() else 1.0
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[docs] / average)
+    weights = idf[word_ids] * tf * (BM25_K1 + 1) / (tf + norm)
+
+    ngrams = {}
+    for word_id, word in enumerate(vocab):
+        for gram in _ngrams(word):
+            ngrams.setdefault(gram, []).append(word_id)
+
+    return {
+        'size': size,
+        'vocab': vocab,
+        'bounds': bounds,
+        'docs': docs,
+        'weights': weights,
+        'ngrams': {gram: np.array(ids, dtype=np.int64) for gram, ids in ngrams.items()}
+    }
+
+def _matching_words(index, term):
+    """Ids das palavras do vocabulário que casam com o termo, e o peso de cada uma"""
+    vocab = index['vocab']
+    start = np.searchsorted(vocab, term, side='left')
+    stop = np.searchsorted(vocab, term + '\uffff', side='left')
+    ids = np.arange(start, stop)
+    found = np.full(len(ids), PREFIX_WEIGHT)
+    if start < stop and vocab[start] == term:
+        found[0] = EXACT_WEIGHT
+
+    if len(term) < NGRAM_SIZE:
+        return ids, found
+    candidates = None
+    for gram in _ngrams(term):
+        gram_ids = index['ngrams'].get(gram)
+        if gram_ids is None:
+            return ids, found
+        candidates = gram_ids if candidates is None else np.intersect1d(candidates, gram_ids, assume_unique=True)
+    # Trechos no meio da palavra (os começos já foram encontrados acima)
+    infix = np.array([
+        word_id for word_id in candidates
+        if not start <= word_id < stop and term in vocab[word_id]
+    ], dtype=np.int64)
+    return (
+        np.concatenate((ids, infix)),
+        np.concatenate((found, np.full(len(infix), INFIX_WEIGHT)))
+    )
+
+def _postings(bounds, ids):
+    """Índices, em docs/weights, das entradas das palavras informadas"""
+    starts, counts = bounds[ids], bounds[ids + 1] - bounds[ids]
+    offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+    return np.arange(counts.sum()) + offsets, counts
+
+def search(index, query):
+    """
+    Busca as linhas que contêm todos os termos da consulta, sem diferenciar
+    acentos nem maiúsculas. Cada termo casa com palavras inteiras, com o
+    começo delas e, a partir de NGRAM_SIZE letras, com trechos no meio.
+
+    Returns:
+        (posições ordenadas, pontuação de cada posição), ou None se a
+        consulta não tiver nenhum termo
+    """
+    terms = tokenize(pd.Series([query], dtype=object)).iloc[0]
+    if not terms:
+        return None
+
+    size = index['size']
+    bounds, docs, weights = index['bounds'], index['docs'], index['weights']
+    total = np.zeros(size)
+    found = np.ones(size, dtype=bool)
+    for term in dict.fromkeys(terms):
+        ids, term_weights = _matching_words(index, term)
+        postings, counts = _postings(bounds, ids)
+        # Uma linha com várias palavras que casam com o termo conta a melhor delas
+        term_score = np.zeros(size)
+        np.maximum.at(term_score, docs[postings], np.repeat(term_weights, counts) * weights[postings])
+        found &= term_score > 0
+        total += term_score
+
+    positions = np.flatnonzero(found)
+    return positions, total[positions]
@@ -0,0 +1,109 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import sqlite3
+import time
+
+import streamlit as st
+
+# Validade (segundos) do token de sessão
+SESSION_TTL = 12 * 3600
+# Campos do usuário guardados no token (nunca a senha)
+SESSION_FIELDS = ('Login', 'Email', 'Tipo de Usuário')
+# Parâmetro da URL que guarda o token de sessão assinado
+SESSION_QUERY_PARAM = "sessao"
+# Arquivo com as sessões encerradas (sair invalida os tokens antes da validade)
+SESSION_STORE_PATH = os.environ.get('SESSION_STORE_PATH', os.path.join('.cache', 'sessions.sqlite3'))
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def _secret():
+    """
+    Chave de assinatura dos tokens: SESSION_SECRET nos secrets do Streamlit
+    ou, na falta dela, derivada da chave privada da conta de serviço
+    """
+    secret = st.secrets.get("SESSION_SECRET")
+    if not secret:
+        private_key = dict(st.secrets["GOOGLE_CREDENTIALS"]).get('private_key', '')
+        secret = hashlib.sha256(f"session:{private_key}".encode()).hexdigest()
+    return str(secret).encode()
+
+def _sign(payload):
+    return _b64encode(hmac.new(_secret(), payload.encode(), hashlib.sha256).digest())
+
+def _connect():
+    directory = os.path.dirname(SESSION_STORE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(SESSION_STORE_PATH, timeout=10)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS revoked (sid TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+    )
+    return conn
+
+def _is_revoked(session_id):
+    conn = _connect()
+    try:
+        return conn.execute(
+            "SELECT 1 FROM revoked WHERE sid = ? AND expires_at > ?", (session_id, time.time())
+        ).fetchone() is not None
+    finally:
+        conn.close()
+
+def issue_token(user, ttl=SESSION_TTL, session_id=None):
+    """
+    Gera um token assinado e com validade para o usuário autenticado.
+    Renovações informam o session_id do token anterior, para que sair
+    invalide todos os tokens do mesmo login.
+    """
+    claims = {field: user.get(field, '') for field in SESSION_FIELDS}
+    claims['sid'] = session_id or _b64encode(os.urandom(12))
+    claims['exp'] = int(time.time() + ttl)
+    payload = _b64encode(json.dumps(claims, ensure_ascii=False).encode())
+    return f"{payload}.{_sign(payload)}"
+
+def verify_token(token):
+    """
+    Valida o token localmente (assinatura, validade e sessão não encerrada),
+    sem acessar a planilha. Retorna (usuário, segundos restantes) ou
+    (None, 0) se inválido; o usuário inclui o 'sid' da sessão.
+    """
+    try:
+        payload, signature = str(token).split('.', 1)
+        if not hmac.compare_digest(signature, _sign(payload)):
+            return None, 0
+        claims = json.loads(_b64decode(payload))
+        remaining = int(claims.pop('exp', 0)) - time.time()
+        # Tokens sem sessão não podem ser revogados e não são aceitos
+        if remaining <= 0 or not claims.get('sid') or _is_revoked(claims['sid']):
+            return None, 0
+        return claims, remaining
+    except (ValueError, TypeError, KeyError, sqlite3.Error):
+        return None, 0
+
+def revoke_token(token):
+    """
+    Encerra a sessão do token (ao sair): ele e os demais tokens do mesmo
+    login deixam de ser aceitos, mesmo dentro da validade
+    """
+    user, _ = verify_token(token)
+    if user is None:
+        return
+    now = time.time()
+    conn = _connect()
+    try:
+        with conn:
+            # Nenhum token da sessão vale além de SESSION_TTL a partir de agora
+            conn.execute(
+                "INSERT OR REPLACE INTO revoked (sid, expires_at) VALUES (?, ?)",
+                (user['sid'], now + SESSION_TTL)
+            )
+            conn.execute("DELETE FROM revoked WHERE expires_at <= ?", (now,))
+    finally:
+        conn.close()
@@ -0,0 +1,394 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+from utils.google_sheets import ROW_ID_COLUMN
+from utils.metrics import instrument
+from utils.schema import apply_schema
+from utils.storage import StorageBackend
+
+# Arquivo do banco local usado pelo backend SQLite
+SQLITE_PATH = os.environ.get('STORAGE_SQLITE_PATH', os.path.join('.cache', 'storage.sqlite3'))
+
+def _casefold(value):
+    return None if value is None else str(value).casefold()
+
+def _text(value):
+    return '' if value is None else str(value)
+
+class SQLiteBackend(StorageBackend):
+    """
+    Banco SQLite local com índices (posição da linha, ID e colunas buscadas).
+    Cada aba vira uma tabela com as colunas c0..cN (na ordem dos cabeçalhos)
+    e a coluna _pos com o número da linha na planilha.
+
+    Com `primary` (um SheetsBackend), a planilha continua sendo a fonte
+    oficial: as escritas vão primeiro para ela e depois para o banco, a
+    localização de linhas é feita nela, e sync() recarrega a tabela local
+    quando a planilha muda. Sem `primary`, o app roda só no banco local.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path=None, primary=None):
+        self.path = path or SQLITE_PATH
+        self.primary = primary
+        # Serializa as escritas, que deslocam a numeração das linhas
+        self._write_lock = threading.RLock()
+        self._meta = {}
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.create_function('casefold', 1, _casefold, deterministic=True)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tables ("
+            "name TEXT PRIMARY KEY, sql_name TEXT NOT NULL, headers TEXT NOT NULL, "
+            "version TEXT, synced_at REAL NOT NULL)"
+        )
+        return conn
+
+    def _table_meta(self, table):
+        """(nome da tabela SQL, cabeçalhos, versão) ou None se a tabela não existir"""
+        meta = self._meta.get(table)
+        if meta is None:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT sql_name, headers, version FROM tables WHERE name = ?", (table,)
+                ).fetchone()
+            finally:
+                conn.close()
+            if row is None:
+                return None
+            meta = (row[0], json.loads(row[1]), row[2])
+            self._meta[table] = meta
+        return meta
+
+    def _ensure(self, table):
+        """Metadados da tabela, carregando-a da planilha na primeira vez"""
+        meta = self._table_meta(table)
+        if meta is None and self.primary is not None:
+            self.sync(table)
+            meta = self._table_meta(table)
+        return meta
+
+    @staticmethod
+    def _column(headers, name):
+        return f"c{headers.index(name)}"
+
+    @instrument
+    def load_table(self, table, headers, rows, version=None):
+        """Substitui o conteúdo da tabela (cabeçalhos + linhas como listas)"""
+        sql_name = "t_" + hashlib.sha1(table.encode()).hexdigest()[:12]
+        width = len(headers)
+        columns = ", ".join(f"c{i} TEXT" for i in range(width))
+        placeholders = ", ".join("?" * (width + 1))
+        values = (
+            [pos] + [_text(row[i]) if i < len(row) else '' for i in range(width)]
+            for pos, row in enumerate(rows, start=2)
+        )
+        with self._write_lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(f"DROP TABLE IF EXISTS {sql_name}")
+                    conn.execute(f"CREATE TABLE {sql_name} (_pos INTEGER NOT NULL, {columns})")
+                    conn.executemany(f"INSERT INTO {sql_name} VALUES ({placeholders})", values)
+                    conn.execute(f"CREATE INDEX ix_{sql_name}_pos ON {sql_name} (_pos)")
+                    if ROW_ID_COLUMN in headers:
+                        column = self._column(headers, ROW_ID_COLUMN)
+                        conn.execute(f"CREATE INDEX ix_{sql_name}_id ON {sql_name} ({column})")
+                    conn.execute(
+                        "INSERT OR REPLACE INTO tables (name, sql_name, headers, version, synced_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (table, sql_name, json.dumps(headers, ensure_ascii=False), version, time.time())
+                    )
+            finally:
+                conn.close()
+            self._meta.pop(table, None)
+
+    @instrument
+    def sync(self, table):
+        if self.primary is None:
+            return False
+        meta = self._table_meta(table)
+        version = self.primary.version(table)
+        if meta is not None and version is not None and version == meta[2]:
+            return False
+        headers, rows = self.primary.dump(table)
+        if headers is None:
+            return False
+        self.load_table(table, headers, rows, version)
+        return True
+
+    def headers(self, table, refresh=False):
+        if refresh:
+            self.sync(table)
+        meta = self._ensure(table)
+        return meta[1] if meta else None
+
+    @instrument
+    def read(self, table, schema=None, columns=None):
+        try:
+            meta = self._ensure(table)
+            if meta is None:
+                return None
+            sql_name, headers, _ = meta
+            names = [h for h in headers if h in columns] if columns else list(headers)
+            selected = ", ".join(self._column(headers, name) for name in names) or "_pos"
+            conn = self._connect()
+            try:
+                rows = conn.execute(f"SELECT {selected} FROM {sql_name} ORDER BY _pos").fetchall()
+            finally:
+                conn.close()
+            df = pd.DataFrame(rows, columns=names) if names else pd.DataFrame(index=range(len(rows)))
+            if schema:
+                df = apply_schema(df, schema)
+            return df
+        except sqlite3.Error as e:
+            st.error(f"Erro ao ler o banco local: {str(e)}")
+            return None
+
+    @instrument
+    def fetch_row(self, table, row_num):
+        meta = self._ensure(table)
+        if meta is None:
+            return None
+        sql_name, headers, _ = meta
+        conn = self._connect()
+        try:
+            row = conn.execute(f"SELECT * FROM {sql_name} WHERE _pos = ?", (row_num,)).fetchone()
+        finally:
+            conn.close()
+        return dict(zip(headers, row[1:])) if row else None
+
+    @staticmethod
+    def _lookup_index(conn, sql_name, sql_column):
+        """Índice sobre o valor normalizado, criado na primeira busca pela coluna"""
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS ix_{sql_name}_{sql_column}_cf "
+            f"ON {sql_name} (casefold({sql_column}))"
+        )
+
+    @instrument
+    def refresh_lookup(self, table, column):
+        self.sync(table)
+        meta = self._ensure(table)
+        if meta is None or column not in meta[1]:
+            return False
+        conn = self._connect()
+        try:
+            with conn:
+                self._lookup_index(conn, meta[0], self._column(meta[1], column))
+        finally:
+            conn.close()
+        return True
+
+    @instrument
+    def ensure_row_ids(self, table, create=True):
+        if self.primary is not None:
+            # A coluna é criada na planilha e chega ao banco pela sincronização
+            if not self.primary.ensure_row_ids(table, create=create):
+                return False
+            self.sync(table)
+        meta = self._ensure(table)
+        if meta is None:
+            return False
+        sql_name, headers, version = meta
+        if ROW_ID_COLUMN in headers:
+            return True
+        if not create:
+            return False
+        with self._write_lock:
+            conn = self._connect()
+            try:
+                rows = conn.execute(f"SELECT * FROM {sql_name} ORDER BY _pos").fetchall()
+            finally:
+                conn.close()
+            self.load_table(
+                table, headers + [ROW_ID_COLUMN], [list(row[1:]) + [self.new_row_id()] for row in rows], version
+            )
+        return True
+
+    @instrument
+    def lookup(self, table, column, value):
+        meta = self._ensure(table)
+        if meta is None or column not in meta[1]:
+            return None
+        sql_name, headers, _ = meta
+        sql_column = self._column(headers, column)
+        conn = self._connect()
+        try:
+            self._lookup_index(conn, sql_name, sql_column)
+            row = conn.execute(
+                f"SELECT * FROM {sql_name} WHERE casefold({sql_column}) = ? ORDER BY _pos LIMIT 1",
+                (_casefold(value),)
+            ).fetchone()
+        finally:
+            conn.close()
+        return dict(zip(headers, row[1:])) if row else None
+
+    @instrument
+    def locate(self, table, expected_row, row_id=None, expected_values=None):
+        # Com sincronização, o endereço da linha é o da planilha
+        if self.primary is not None:
+            return self.primary.locate(table, expected_row, row_id, expected_values)
+        meta = self._ensure(table)
+        if meta is None:
+            return None
+        sql_name, headers, _ = meta
+        conn = self._connect()
+        try:
+            if row_id and ROW_ID_COLUMN in headers:
+                row = conn.execute(
+                    f"SELECT _pos FROM {sql_name} WHERE {self._column(headers, ROW_ID_COLUMN)} = ? "
+                    "ORDER BY _pos LIMIT 1",
+                    (str(row_id),)
+                ).fetchone()
+                return row[0] if row else None
+            if not expected_row or expected_row < 2:
+                return None
+            row = conn.execute(f"SELECT * FROM {sql_name} WHERE _pos = ?", (expected_row,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        current = dict(zip(headers, row[1:]))
+        for column, value in (expected_values or {}).items():
+            if column in headers and str(current.get(column, '')) != str(value):
+                return None
+        return expected_row
+
+    def _insert(self, meta, rows):
+        """Adiciona linhas (listas na ordem dos cabeçalhos) ao final da tabela"""
+        sql_name, headers, _ = meta
+        width = len(headers)
+        with self._write_lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    last = conn.execute(f"SELECT COALESCE(MAX(_pos), 1) FROM {sql_name}").fetchone()[0]
+                    conn.executemany(
+                        f"INSERT INTO {sql_name} VALUES ({', '.join('?' * (width + 1))})",
+                        (
+                            [pos] + [_text(row[i]) if i < len(row) else '' for i in range(width)]
+                            for pos, row in enumerate(rows, start=last + 1)
+                        )
+                    )
+            finally:
+                conn.close()
+
+    @instrument
+    def append(self, table, values):
+        meta = self._ensure(table)
+        if meta is None:
+            return False
+        headers = meta[1]
+        if isinstance(values, dict):
+            # O ID é gerado aqui para que a planilha e o banco recebam o mesmo valor
+            if ROW_ID_COLUMN in headers and not values.get(ROW_ID_COLUMN):
+                values = {**values, ROW_ID_COLUMN: self.new_row_id()}
+            values = [values.get(header, '') for header in headers]
+        if self.primary is not None and not self.primary.append(table, values):
+            return False
+        try:
+            self._insert(meta, [values])
+            return True
+        except sqlite3.Error as e:
+            st.error(f"Erro ao gravar no banco local: {str(e)}")
+            return False
+
+    @instrument
+    def append_rows(self, table, rows, chunk_size=500, start=0, on_chunk=None):
+        meta = self._ensure(table)
+        if meta is None:
+            return start
+        done = start
+        if self.primary is not None:
+            done = self.primary.append_rows(table, rows, chunk_size, start, on_chunk)
+            self._insert(meta, rows[start:done])
+            return done
+        while done < len(rows):
+            chunk = rows[done:done + chunk_size]
+            self._insert(meta, chunk)
+            done += len(chunk)
+            if on_chunk:
+                on_chunk(done)
+        return done
+
+    @instrument
+    def update(self, table, updates):
+        meta = self._ensure(table)
+        if meta is None:
+            return False
+        if self.primary is not None and not self.primary.update(table, updates):
+            return False
+        sql_name, headers, _ = meta
+        try:
+            with self._write_lock:
+                conn = self._connect()
+                try:
+                    with conn:
+                        for row_num, values in updates.items():
+                            if not isinstance(values, dict):
+                                values = dict(zip(headers, values))
+                            known = [(self._column(headers, k), _text(v)) for k, v in values.items() if k in headers]
+                            if known:
+                                assignments = ", ".join(f"{column} = ?" for column, _ in known)
+                                conn.execute(
+                                    f"UPDATE {sql_name} SET {assignments} WHERE _pos = ?",
+                                    [value for _, value in known] + [row_num]
+                                )
+                finally:
+                    conn.close()
+            return True
+        except sqlite3.Error as e:
+            st.error(f"Erro ao atualizar o banco local: {str(e)}")
+            return False
+
+    @instrument
+    def locate_many(self, table, targets):
+        if self.primary is not None:
+            return self.primary.locate_many(table, targets)
+        return [self.locate(table, *target) for target in targets]
+
+    @instrument
+    def delete_many(self, table, row_nums):
+        meta = self._ensure(table)
+        if meta is None:
+            return False
+        if self.primary is not None and not self.primary.delete_many(table, row_nums):
+            return False
+        sql_name = meta[0]
+        deleted = json.dumps(sorted(set(row_nums)))
+        try:
+            with self._write_lock:
+                conn = self._connect()
+                try:
+                    with conn:
+                        conn.execute(
+                            f"DELETE FROM {sql_name} WHERE _pos IN (SELECT value FROM json_each(?))",
+                            (deleted,)
+                        )
+                        # Cada linha sobe tantas posições quantas foram excluídas acima dela
+                        conn.execute(
+                            f"UPDATE {sql_name} SET _pos = _pos - "
+                            f"(SELECT COUNT(*) FROM json_each(?) WHERE value < {sql_name}._pos)",
+                            (deleted,)
+                        )
+                finally:
+                    conn.close()
+            return True
+        except sqlite3.Error as e:
+            st.error(f"Erro ao excluir do banco local: {str(e)}")
+            return False
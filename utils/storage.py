@@ -0,0 +1,203 @@
+import os
+from abc import ABC, abstractmethod
+
+from utils import google_sheets as gs
+
+# Backend usado pelo app: 'sheets' (Google Sheets) ou 'sqlite' (banco local)
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'sheets')
+# Com o backend SQLite, replica as escritas e recarrega as tabelas do Google Sheets
+STORAGE_SYNC = os.environ.get('STORAGE_SYNC', '1') not in ('0', 'false', 'False', '')
+# Com o backend do Google Sheets, grava as edições no diário local e envia em segundo plano
+STORAGE_JOURNAL = os.environ.get('STORAGE_JOURNAL', '1') not in ('0', 'false', 'False', '')
+# Autoriza o app a criar a coluna de identificadores na planilha (muda o layout da aba)
+STORAGE_CREATE_ROW_IDS = os.environ.get('STORAGE_CREATE_ROW_IDS', '0') not in ('0', 'false', 'False', '')
+
+class StorageBackend(ABC):
+    """
+    Operações de leitura, busca e escrita que o app precisa do armazenamento.
+    As tabelas são as abas da planilha e, em todos os backends, as linhas seguem
+    a numeração do Google Sheets (linha 1 = cabeçalho, dados a partir da 2),
+    para que o app e a sincronização usem os mesmos endereços.
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def headers(self, table, refresh=False):
+        """
+        Cabeçalhos da tabela, ou None se ela não existir. Com refresh=True,
+        relidos da fonte (para montar linhas na ordem atual das colunas).
+        """
+
+    @abstractmethod
+    def read(self, table, schema=None, columns=None):
+        """Conteúdo da tabela como DataFrame (opcionalmente tipado e projetado)"""
+
+    @abstractmethod
+    def fetch_row(self, table, row_num):
+        """Uma linha completa, como dicionário cabeçalho -> valor"""
+
+    @abstractmethod
+    def lookup(self, table, column, value):
+        """Primeiro registro com column igual a value (sem diferenciar maiúsculas)"""
+
+    @abstractmethod
+    def locate(self, table, expected_row, row_id=None, expected_values=None):
+        """Número atual da linha do registro, ou None se não for encontrado"""
+
+    def locate_many(self, table, targets):
+        """
+        Localiza vários registros: targets = [(linha esperada, ID, valores esperados)].
+        Retorna a lista de números de linha, ou None se a busca falhar.
+        """
+        return [self.locate(table, *target) for target in targets]
+
+    @abstractmethod
+    def append(self, table, values):
+        """Adiciona um registro (dict cabeçalho -> valor) ao final da tabela"""
+
+    @abstractmethod
+    def append_rows(self, table, rows, chunk_size=500, start=0, on_chunk=None):
+        """Adiciona linhas (listas na ordem dos cabeçalhos) em lotes; retorna o total gravado"""
+
+    @abstractmethod
+    def update(self, table, updates):
+        """Atualiza várias linhas: {número da linha: dict cabeçalho -> valor}"""
+
+    def delete(self, table, row_num):
+        """Remove uma linha"""
+        return self.delete_many(table, [row_num])
+
+    @abstractmethod
+    def delete_many(self, table, row_nums):
+        """Remove várias linhas de uma vez"""
+
+    def update_record(self, table, target, values):
+        """
+        Atualiza o registro identificado por target = (linha esperada, ID,
+        valores esperados). Retorna o número da linha, ou None se o registro
+        não foi encontrado ou a escrita falhou.
+        """
+        row_num = self.locate(table, *target)
+        if row_num is None or not self.update(table, {row_num: values}):
+            return None
+        return row_num
+
+    def delete_records(self, table, targets):
+        """
+        Remove os registros identificados por targets (ver update_record).
+        Retorna os números das linhas removidas, ou None se algum registro
+        não foi encontrado ou a escrita falhou.
+        """
+        row_nums = self.locate_many(table, targets)
+        if row_nums is None or None in row_nums or not self.delete_many(table, row_nums):
+            return None
+        return row_nums
+
+    def start(self, on_flush=None):
+        """Inicia as tarefas em segundo plano do backend, se houver"""
+
+    def journal_status(self):
+        """Resumo das escritas ainda não confirmadas, ou None sem diário"""
+        return None
+
+    def pending_writes(self, table):
+        """Escritas da tabela aceitas mas ainda não gravadas na fonte (0 sem diário)"""
+        return 0
+
+    def refresh_lookup(self, table, column):
+        """Prepara o índice usado por lookup (chamado em segundo plano)"""
+        return True
+
+    def ensure_row_ids(self, table, create=True):
+        """
+        Garante a coluna de identificadores (ROW_ID_COLUMN) da tabela,
+        criando-a com um ID por linha se preciso (e create=True); retorna
+        True se ela existe
+        """
+        return True
+
+    def sync(self, table):
+        """Atualiza a cópia local a partir da fonte; retorna True se os dados mudaram"""
+        return False
+
+    def new_row_id(self):
+        return gs.new_row_id()
+
+class SheetsBackend(StorageBackend):
+    """Google Sheets, pelas funções de utils/google_sheets.py"""
+
+    name = 'sheets'
+
+    def __init__(self, url):
+        self.url = url
+
+    def headers(self, table, refresh=False):
+        return gs.get_headers(self.url, table, refresh=refresh)
+
+    def version(self, table):
+        return gs.get_sheet_version(self.url)
+
+    def read(self, table, schema=None, columns=None):
+        return gs.read_sheet_to_dataframe(self.url, table, schema=schema, columns=columns)
+
+    def fetch_row(self, table, row_num):
+        return gs.fetch_row(self.url, table, row_num)
+
+    def lookup(self, table, column, value):
+        return gs.find_record(self.url, table, column, value)
+
+    def refresh_lookup(self, table, column):
+        return gs.refresh_lookup_index(self.url, table, column)
+
+    def ensure_row_ids(self, table, create=True):
+        return gs.ensure_row_ids(self.url, table, create=create)
+
+    def locate(self, table, expected_row, row_id=None, expected_values=None):
+        return gs.locate_row(self.url, table, expected_row, row_id, expected_values)
+
+    def locate_many(self, table, targets):
+        return gs.locate_rows(self.url, table, targets)
+
+    def append(self, table, values):
+        return gs.update_row_in_sheet(self.url, table, -1, values)
+
+    def append_rows(self, table, rows, chunk_size=500, start=0, on_chunk=None):
+        return gs.append_rows_in_sheet(self.url, table, rows, chunk_size, start, on_chunk)
+
+    def update(self, table, updates):
+        return gs.update_rows_in_sheet(self.url, table, updates)
+
+    def delete(self, table, row_num):
+        return gs.delete_row_in_sheet(self.url, table, row_num)
+
+    def delete_many(self, table, row_nums):
+        return gs.delete_rows_in_sheet(self.url, table, row_nums)
+
+    def dump(self, table):
+        """Cabeçalhos e todas as linhas (listas) da aba, ou (None, None)"""
+        headers = self.headers(table)
+        if not headers:
+            return None, None
+        records = gs.fetch_records(self.url, table)
+        if records is None:
+            return None, None
+        return headers, [[record.get(h, '') for h in headers] for record in records]
+
+def create_backend(url, kind=STORAGE_BACKEND, sync=STORAGE_SYNC, path=None, journal=STORAGE_JOURNAL,
+                   journal_tables=None):
+    """
+    Cria o backend configurado. Com 'sqlite', a planilha continua sendo a
+    fonte oficial quando sync=True; com sync=False o app roda só no banco local.
+    Com 'sheets' e journal=True, as escritas de registros das tabelas em
+    journal_tables (todas, se None) passam pelo diário local (utils/journal.py).
+    """
+    if kind == 'sheets':
+        if journal:
+            from utils.journal import JournaledBackend
+            return JournaledBackend(SheetsBackend(url), tables=journal_tables)
+        return SheetsBackend(url)
+    if kind == 'sqlite':
+        from utils.sqlite_store import SQLiteBackend
+        return SQLiteBackend(path, primary=SheetsBackend(url) if sync else None)
+    raise ValueError(f"Backend de armazenamento desconhecido: {kind}")